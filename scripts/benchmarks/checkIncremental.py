@@ -0,0 +1,196 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import traceback
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, "..", "db_management"))
+sys.path.append(os.path.join(HERE, "..", "mrankings"))
+sys.path.append(os.path.join(HERE, "..", "model_training"))
+
+from createDB import connect, create_database, read_watermark
+from fillDB import bulk_insert_data
+from seasonStore import fingerprint, load_store
+from fillRanks import compute_rolling_team_stats
+from fillElo import update_elo_ratings
+from featureMatrix import load_matrix
+from synthData import generate_box_scores
+
+# Small synthetic history: 3 seasons of 8 weeks plus a bowl week, 40 teams
+N_TEAMS, N_SEASONS, N_WEEKS, SEED = 40, 3, 8, 0
+FIRST_SEASON = 2002
+
+# Where the incremental runs pick up: mid-season, the next week, across a season boundary, then the rest
+CUTS = [(2002, 4), (2002, 5), (2003, 7), (2004, 2), (9999, 0)]
+
+# Tables the rolling-stat and Elo stages leave behind; incremental, streaming and full runs must agree on all of them
+TABLES = {
+    'rolling_team_stats': "SELECT * FROM rolling_team_stats ORDER BY team_id, season, week",
+    'rolling_accumulators': "SELECT * FROM rolling_accumulators ORDER BY team_id",
+    'elo_state': "SELECT * FROM elo_state ORDER BY team_id",
+}
+
+def _quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+def _source_db(directory):
+    # Every synthetic game loaded, no stage run yet
+    path = os.path.join(directory, "source.db")
+    _quiet(create_database, path)
+    df = generate_box_scores(N_TEAMS, N_SEASONS, N_WEEKS, first_season=FIRST_SEASON, seed=SEED)
+    _quiet(bulk_insert_data, df, path)
+    return path
+
+def _copy(source, directory, name):
+    path = os.path.join(directory, name)
+    shutil.copy(source, path)
+    return path
+
+def _load_through(db_path, source, after, through):
+    # Copy the source's games and box scores in (after, through] into db_path, as a weekly load would
+    conn = connect(db_path)
+    conn.execute("ATTACH ? AS src", (source,))
+    conn.execute("""
+        INSERT INTO games SELECT * FROM src.games WHERE (season, week) > (?, ?) AND (season, week) <= (?, ?)
+    """, (*after, *through))
+    conn.execute("""
+        INSERT INTO team_game_stats SELECT s.* FROM src.team_game_stats s JOIN src.games g USING (game_id)
+        WHERE (g.season, g.week) > (?, ?) AND (g.season, g.week) <= (?, ?)
+    """, (*after, *through))
+    conn.commit()
+    conn.close()
+
+def _truncate(db_path, after):
+    # Drop every game (and its box scores) after `after`
+    conn = connect(db_path)
+    conn.execute("DELETE FROM team_game_stats WHERE game_id IN (SELECT game_id FROM games WHERE (season, week) > (?, ?))",
+                 after)
+    conn.execute("DELETE FROM games WHERE (season, week) > (?, ?)", after)
+    conn.commit()
+    conn.close()
+
+def _rank_stages(db_path, incremental=False, streaming=False):
+    _quiet(compute_rolling_team_stats, db_path, verbose=False, incremental=incremental, streaming=streaming)
+    _quiet(update_elo_ratings, db_path, base_k=25, decay_factor=0.97, verbose=False, incremental=incremental,
+           streaming=streaming)
+
+def _tables(db_path):
+    conn = connect(db_path)
+    tables = {name: pd.read_sql_query(query, conn) for name, query in TABLES.items()}
+    conn.close()
+    return tables
+
+def _assert_same(expected, actual, label):
+    for name, frame in expected.items():
+        assert len(frame), f"{label}: {name} is empty"
+        pd.testing.assert_frame_equal(frame, actual[name], check_exact=False, rtol=1e-9, obj=f"{label}: {name}")
+
+def test_rolling_stats_modes_agree():
+    # Full batch, full streaming and week-by-week incremental runs (batch and streaming) build the same tables
+    with tempfile.TemporaryDirectory() as directory:
+        source = _source_db(directory)
+        full = _copy(source, directory, "full.db")
+        _rank_stages(full)
+        expected = _tables(full)
+
+        streamed = _copy(source, directory, "streamed.db")
+        _rank_stages(streamed, streaming=True)
+        _assert_same(expected, _tables(streamed), "streaming")
+
+        for streaming in (False, True):
+            db_path = _copy(source, directory, f"incremental-{streaming}.db")
+            _truncate(db_path, CUTS[0])
+            _rank_stages(db_path, incremental=True, streaming=streaming)
+            for after, through in zip(CUTS, CUTS[1:]):
+                _load_through(db_path, source, after, through)
+                _rank_stages(db_path, incremental=True, streaming=streaming)
+            _assert_same(expected, _tables(db_path), f"incremental (streaming={streaming})")
+
+def test_elo_waits_for_ranks():
+    # fillElo run on newly loaded weeks before fillRanks must not rate them from stale rolling stats
+    with tempfile.TemporaryDirectory() as directory:
+        source = _source_db(directory)
+        full = _copy(source, directory, "full.db")
+        _rank_stages(full)
+
+        db_path = _copy(source, directory, "ordered.db")
+        _truncate(db_path, (2003, 3))
+        _rank_stages(db_path)
+        _load_through(db_path, source, (2003, 3), CUTS[-1])
+
+        _quiet(update_elo_ratings, db_path, base_k=25, decay_factor=0.97, verbose=False, incremental=True)
+        conn = connect(db_path)
+        elo_mark = read_watermark(conn, "elo")
+        conn.close()
+        assert elo_mark is None or tuple(elo_mark[:2]) <= (2003, 3), f"Elo ran ahead of the rolling stats: {elo_mark}"
+
+        _rank_stages(db_path, incremental=True)
+        _assert_same(_tables(full), _tables(db_path), "Elo before fillRanks")
+
+def test_history_edit_rebuilds():
+    # Editing an already processed row drops the watermarks, changes the store fingerprint and rebuilds the
+    # store and the edited season of the feature matrix
+    with tempfile.TemporaryDirectory() as directory:
+        source = _source_db(directory)
+        db_path = _copy(source, directory, "edited.db")
+        _rank_stages(db_path)
+        store = load_store(db_path)
+        old_rush = store.column("home_rush_yards").copy()
+        matrix = load_matrix(db_path)
+        old_signatures = {s: v['signature'] for s, v in matrix.manifest['seasons'].items()}
+        old_matrix = np.array(matrix.matrix)
+
+        conn = connect(db_path)
+        before = fingerprint(conn)
+        game_id, team_id = conn.execute("""
+            SELECT g.game_id, g.home_team_id FROM games g
+            JOIN team_game_stats s ON s.game_id = g.game_id AND s.team_id = g.home_team_id
+            WHERE g.season = ? AND g.week = 2 AND g.game_type = 'regular' ORDER BY g.game_id LIMIT 1
+        """, (FIRST_SEASON,)).fetchone()
+        conn.execute("UPDATE team_game_stats SET rush_yards = rush_yards + 50 WHERE game_id = ? AND team_id = ?",
+                     (game_id, team_id))
+        conn.commit()
+        after = fingerprint(conn)
+        marks = conn.execute("SELECT stage FROM stage_watermarks").fetchall()
+        conn.close()
+        assert before != after, "store fingerprint unchanged after an edit"
+        assert not marks, f"watermarks survived an edit inside their history: {marks}"
+
+        store = load_store(db_path)
+        assert store.manifest['fingerprint'] == after
+        row = int(np.flatnonzero(store['game_id'][:] == game_id)[0])
+        assert store.column("home_rush_yards")[row] == old_rush[row] + 50, "season store was not rebuilt"
+
+        # Incremental reruns fall back to a full rebuild and agree with one run from scratch
+        _rank_stages(db_path, incremental=True)
+        rebuilt = _copy(db_path, directory, "rebuilt.db")
+        _rank_stages(rebuilt)
+        _assert_same(_tables(rebuilt), _tables(db_path), "after edit")
+
+        matrix = load_matrix(db_path)
+        signatures = {s: v['signature'] for s, v in matrix.manifest['seasons'].items()}
+        changed = sorted(s for s in signatures if signatures[s] != old_signatures.get(s))
+        assert str(FIRST_SEASON) in changed, "feature matrix kept the edited season"
+        assert not np.array_equal(np.asarray(matrix.matrix), old_matrix), "feature matrix rows unchanged"
+        fresh = load_matrix(db_path, path=os.path.join(directory, "fresh.features"), rebuild=True)
+        assert np.array_equal(np.asarray(matrix.matrix), np.asarray(fresh.matrix), equal_nan=True)
+
+CHECKS = [test_rolling_stats_modes_agree, test_elo_waits_for_ranks, test_history_edit_rebuilds]
+
+# Run it (python checkIncremental.py, or python -m pytest checkIncremental.py; exit status 1 on a failure)
+if __name__ == "__main__":
+    failed = 0
+    for check in CHECKS:
+        try:
+            check()
+            print(f"[OK] {check.__name__}")
+        except Exception:
+            failed += 1
+            print(f"[ERROR] {check.__name__}\n{traceback.format_exc()}")
+    sys.exit(1 if failed else 0)
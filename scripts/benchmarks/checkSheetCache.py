@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+import traceback
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, "..", "db_management"))
+
+import sheetCache
+from sheetCache import load_sheet
+
+SHEET_NAME = "cleaned"
+# Chunk sizes smaller than, around and larger than the sheet, so kinds change across chunk boundaries
+CHUNK_SIZES = [7, 50, 100_000]
+N_ROWS = 120
+
+def _write_sheet(path):
+    # Blanks, read_excel's text NA markers and an int column that turns float part way down
+    from openpyxl import Workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.title = SHEET_NAME
+    ws.append(["season", "week", "game_type", "home", "score_home", "pass_yards", "possession", "note", "empty"])
+    markers = ["n/a", "NA", "NULL", "", None, "#N/A", "nan"]
+    for i in range(N_ROWS):
+        ws.append([
+            2002 + i // 40,
+            None if i % 13 == 5 else i % 15 + 1,
+            markers[i % len(markers)] if i % 11 == 3 else ("bowl" if i % 15 == 14 else "regular"),
+            None if i == 17 else f"Team {i % 9}",
+            markers[i % len(markers)] if i % 9 == 4 else i % 50,
+            i * 3 if i < 60 else i * 3 + 0.5,
+            "NULL" if i == 90 else 1800 + i,
+            "N/A" if i % 4 == 0 else f"note {i}",
+            None,
+        ])
+    wb.save(path)
+
+def test_load_sheet_matches_read_excel():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sheet.xlsx")
+        _write_sheet(path)
+        expected = pd.read_excel(path, sheet_name=SHEET_NAME)
+        default_rows = sheetCache.CHUNK_ROWS
+        try:
+            for chunk_rows in CHUNK_SIZES:
+                sheetCache.CHUNK_ROWS = chunk_rows
+                cache_dir = os.path.join(directory, f"cache-{chunk_rows}")
+                actual = load_sheet(path, SHEET_NAME, cache_dir, verbose=False)
+                # (copied: the cached columns are memory-mapped arrays, which assert_frame_equal treats as another class)
+                pd.testing.assert_frame_equal(expected, actual.copy(), obj=f"load_sheet (chunks of {chunk_rows})")
+        finally:
+            sheetCache.CHUNK_ROWS = default_rows
+
+CHECKS = [test_load_sheet_matches_read_excel]
+
+# Run it (python checkSheetCache.py, or python -m pytest checkSheetCache.py; exit status 1 on a failure)
+if __name__ == "__main__":
+    failed = 0
+    for check in CHECKS:
+        try:
+            check()
+            print(f"[OK] {check.__name__}")
+        except Exception:
+            failed += 1
+            print(f"[ERROR] {check.__name__}\n{traceback.format_exc()}")
+    sys.exit(1 if failed else 0)
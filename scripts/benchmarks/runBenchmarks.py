@@ -0,0 +1,188 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, "..", "db_management"))
+sys.path.append(os.path.join(HERE, "..", "mrankings"))
+
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+STAGES = ["createDB", "fillDB", "fillRanks", "fillElo", "eloCheck", "elorankDisplay"]
+REGRESSION_RATIO = 1.25
+REGRESSION_MIN_SECONDS = 0.25  # ignore timing noise on very short stages
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+def _scalar(db_path, query):
+    from createDB import connect
+    conn = connect(db_path)
+    row = conn.execute(query).fetchone()
+    conn.close()
+    return list(row)
+
+def run_stage(stage, db_path, scale, seed):
+    # Runs in its own process so peak RSS belongs to this stage alone
+    rows, checksum = 0, None
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    if stage == "createDB":
+        from createDB import create_database
+        start_rss = _peak_rss_mb()
+        start = time.perf_counter()
+        with quiet:
+            create_database(db_path)
+
+    elif stage == "fillDB":
+        from fillDB import bulk_insert_data
+        from synthData import generate_scaled
+        df = generate_scaled(scale, seed)
+        start_rss = _peak_rss_mb()
+        start = time.perf_counter()
+        with quiet:
+            bulk_insert_data(df, db_path)
+        rows = len(df)
+        checksum = _scalar(db_path, "SELECT (SELECT COUNT(*) FROM games), (SELECT COUNT(*) FROM team_game_stats)")
+
+    elif stage == "fillRanks":
+        from fillRanks import compute_rolling_team_stats
+        start_rss = _peak_rss_mb()
+        start = time.perf_counter()
+        with quiet:
+            compute_rolling_team_stats(db_path, verbose=False)
+        rows, *checksum = _scalar(db_path, """
+            SELECT COUNT(*), ROUND(TOTAL(rolling_points_scored), 4), ROUND(TOTAL(rolling_total_yards_against), 4),
+                   TOTAL(points_scored_rank)
+            FROM rolling_team_stats""")
+
+    elif stage == "fillElo":
+        from fillElo import update_elo_ratings
+        start_rss = _peak_rss_mb()
+        start = time.perf_counter()
+        with quiet:
+            update_elo_ratings(db_path, base_k=25, decay_factor=0.97, verbose=False)
+        rows = _scalar(db_path, "SELECT COUNT(*) FROM games WHERE game_type = 'regular'")[0]
+        checksum = _scalar(db_path, "SELECT ROUND(TOTAL(rolling_elo), 4) FROM rolling_team_stats")
+
+    elif stage == "eloCheck":
+        from eloCheck import print_top10_elo_weekly
+        start_rss = _peak_rss_mb()
+        start = time.perf_counter()
+        with quiet:
+            print_top10_elo_weekly(db_path)
+        rows = _scalar(db_path, "SELECT COUNT(*) FROM rolling_team_stats")[0]
+
+    elif stage == "elorankDisplay":
+        import warnings
+        import matplotlib
+        matplotlib.use("Agg")
+        warnings.filterwarnings("ignore", message=".*non-interactive.*")
+        from elorankDisplay import print_weekly_top10_and_plot_by_season
+        start_rss = _peak_rss_mb()
+        start = time.perf_counter()
+        with quiet:
+            print_weekly_top10_and_plot_by_season(db_path)
+        rows = _scalar(db_path, "SELECT COUNT(*) FROM rolling_team_stats")[0]
+
+    else:
+        raise ValueError(f"Unknown stage {stage!r}")
+
+    seconds = time.perf_counter() - start
+    return {
+        'stage': stage,
+        'scale': scale,
+        'seconds': round(seconds, 4),
+        'rows': rows,
+        'rows_per_sec': round(rows / seconds, 1) if rows and seconds > 0 else None,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'stage_rss_mb': round(_peak_rss_mb() - start_rss, 1),
+        'checksum': checksum,
+    }
+
+def run_scale(scale, stages=STAGES, seed=0, workdir=None):
+    # Every stage in order against a fresh database, each in a child process
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        db_path = os.path.join(tmp, "cfb_stats.db")
+        results = []
+        for stage in stages:
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--stage", stage,
+                 "--db", db_path, "--scale", str(scale), "--seed", str(seed)],
+                capture_output=True, text=True, cwd=HERE)
+            if out.returncode != 0:
+                raise RuntimeError(f"Stage {stage} failed at scale {scale}:\n{out.stderr}")
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+            print(_format(results[-1]))
+        return results
+
+def _format(result):
+    rate = f"{result['rows_per_sec']:>12,.0f} rows/s" if result['rows_per_sec'] else " " * 19
+    return (f"  {result['stage']:<15} {result['seconds']:>9.3f}s {rate} "
+            f"peak {result['peak_rss_mb']:>8.1f} MB (+{result['stage_rss_mb']:.1f})")
+
+def compare(results, baseline):
+    # Flag stages that got slower than REGRESSION_RATIO (by at least REGRESSION_MIN_SECONDS) or whose outputs changed
+    previous = {(r['scale'], r['stage']): r for r in baseline}
+    problems = []
+    for result in results:
+        old = previous.get((result['scale'], result['stage']))
+        if old is None:
+            continue
+        ratio = result['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        note = f"{ratio:5.2f}x baseline time"
+        if ratio > REGRESSION_RATIO and result['seconds'] - old['seconds'] > REGRESSION_MIN_SECONDS:
+            note += "  [REGRESSION]"
+            problems.append(result['stage'])
+        if result['checksum'] != old['checksum']:
+            note += "  [RESULTS CHANGED]"
+            problems.append(result['stage'])
+        print(f"  {result['scale']:>5}x {result['stage']:<15} {note}")
+    return problems
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each pipeline stage on synthetic data at several history sizes.")
+    parser.add_argument("--scale", type=float, nargs="+", default=[1, 10, 100],
+                        help="multiples of the real 2002-2024 volume")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with this run")
+    parser.add_argument("--report", default=None, help="write this run's results as JSON")
+    parser.add_argument("--stage", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--db", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        # Child process: run one stage and print its result as the last line
+        print(json.dumps(run_stage(args.stage, args.db, args.scale[0], args.seed)))
+        sys.exit(0)
+
+    results = []
+    for scale in args.scale:
+        print(f"\n[LOADING] Scale {scale:g}x")
+        results.extend(run_scale(scale, args.stages, args.seed))
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n[OK] Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        print(f"\n[LOADING] Comparing against {args.baseline}")
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f))
+        if problems:
+            print(f"[WARNING] Regressions or changed results in: {', '.join(sorted(set(problems)))}")
+            sys.exit(1)
+        print("[OK] No regressions against baseline.")
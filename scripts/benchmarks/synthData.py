@@ -0,0 +1,110 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+# Roughly the real 2002-2024 workbook: 23 seasons, ~15 regular-season weeks plus a bowl week
+REAL_SEASONS = 23
+REAL_TEAMS = 130
+REAL_WEEKS = 15
+FIRST_SEASON = 2002
+
+STAT_PREFIXES = [
+    "first_downs", "third_down_comp", "third_down_att", "fourth_down_comp", "fourth_down_att",
+    "pass_comp", "pass_att", "pass_yards", "rush_att", "rush_yards", "total_yards",
+    "fum", "int", "pen_num", "pen_yards", "possession",
+]
+
+def sheet_columns():
+    # Same columns fillDB reads from the "cleaned" sheet
+    columns = ["season", "week", "game_type", "home", "away", "score_home", "score_away"]
+    columns += [f"{q}_{side}" for side in ("home", "away") for q in ("q1", "q2", "q3", "q4", "ot")]
+    columns += [f"{stat}_{side}" for stat in STAT_PREFIXES for side in ("home", "away")]
+    return columns
+
+def generate_box_scores(n_teams=REAL_TEAMS, n_seasons=REAL_SEASONS, n_weeks=REAL_WEEKS,
+                        bye_rate=0.1, bowl_share=0.3, first_season=FIRST_SEASON, seed=0):
+    # Deterministic synthetic box scores; team strength drives yards and points so ratings have signal
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Team {i:04d}" for i in range(n_teams)], dtype=object)
+    strength = rng.normal(0, 1, n_teams)
+
+    frames = []
+    for season in range(first_season, first_season + n_seasons):
+        strength = 0.8 * strength + rng.normal(0, 0.6, n_teams)
+        for week in range(1, n_weeks + 2):
+            bowl = week == n_weeks + 1
+            order = rng.permutation(n_teams)
+            n_games = int(n_teams * (bowl_share if bowl else 1 - bye_rate)) // 2
+            home, away = order[:n_games], order[n_games:2 * n_games]
+            frames.append(_games(rng, season, week, "bowl" if bowl else "regular", home, away, names, strength))
+
+    df = pd.concat(frames, ignore_index=True)
+    return df[sheet_columns()]
+
+def _games(rng, season, week, game_type, home, away, names, strength):
+    n = home.size
+    edge = strength[home] - strength[away] + 0.15
+    data = {"season": season, "week": week, "game_type": game_type, "home": names[home], "away": names[away]}
+
+    for side, sign in (("home", 1), ("away", -1)):
+        pass_att = rng.poisson(32, n)
+        pass_comp = rng.binomial(pass_att, 0.6)
+        pass_yards = np.maximum(0, rng.normal(230 + 25 * sign * edge, 70, n)).round()
+        rush_att = rng.poisson(36, n)
+        rush_yards = rng.normal(160 + 20 * sign * edge, 60, n).round()
+        third_att = rng.poisson(14, n)
+        fourth_att = rng.poisson(1.5, n)
+
+        touchdowns = rng.poisson(np.clip(0.6 + 0.2 * sign * edge, 0.05, None)[:, None], (n, 4))
+        quarters = 7 * touchdowns + 3 * rng.poisson(0.35, (n, 4))
+        for i, q in enumerate(("q1", "q2", "q3", "q4")):
+            data[f"{q}_{side}"] = quarters[:, i]
+        data[f"ot_{side}"] = np.zeros(n, dtype=np.int64)
+
+        data[f"first_downs_{side}"] = rng.poisson(20 + 2 * sign * edge.clip(-3, 3), n)
+        data[f"third_down_att_{side}"] = third_att
+        data[f"third_down_comp_{side}"] = rng.binomial(third_att, 0.4)
+        data[f"fourth_down_att_{side}"] = fourth_att
+        data[f"fourth_down_comp_{side}"] = rng.binomial(fourth_att, 0.5)
+        data[f"pass_comp_{side}"] = pass_comp
+        data[f"pass_att_{side}"] = pass_att
+        data[f"pass_yards_{side}"] = pass_yards
+        data[f"rush_att_{side}"] = rush_att
+        data[f"rush_yards_{side}"] = rush_yards
+        data[f"total_yards_{side}"] = pass_yards + rush_yards
+        data[f"fum_{side}"] = rng.poisson(0.8, n)
+        data[f"int_{side}"] = rng.poisson(0.9, n)
+        data[f"pen_num_{side}"] = rng.poisson(6, n)
+        data[f"pen_yards_{side}"] = data[f"pen_num_{side}"] * rng.integers(5, 12, n)
+
+    # Overtime for tied games, then final scores from the quarter lines
+    tied = sum(data[f"{q}_home"] for q in ("q1", "q2", "q3", "q4")) == sum(data[f"{q}_away"] for q in ("q1", "q2", "q3", "q4"))
+    home_wins_ot = rng.random(n) < 0.5
+    data["ot_home"] = np.where(tied & home_wins_ot, 7, 0)
+    data["ot_away"] = np.where(tied & ~home_wins_ot, 7, 0)
+    for side in ("home", "away"):
+        data[f"score_{side}"] = sum(data[f"{q}_{side}"] for q in ("q1", "q2", "q3", "q4", "ot"))
+
+    data["possession_home"] = rng.normal(30, 3, n).round(2)
+    data["possession_away"] = (60 - data["possession_home"]).round(2)
+    return pd.DataFrame(data)
+
+def generate_scaled(scale=1, seed=0):
+    # `scale` times the real history, grown by adding seasons (history length is what the stages scale with)
+    return generate_box_scores(n_seasons=max(1, round(REAL_SEASONS * scale)), seed=seed)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a deterministic synthetic box-score sheet.")
+    parser.add_argument("out", help="output .xlsx (sheet 'cleaned') or .csv")
+    parser.add_argument("--teams", type=int, default=REAL_TEAMS)
+    parser.add_argument("--seasons", type=int, default=REAL_SEASONS)
+    parser.add_argument("--weeks", type=int, default=REAL_WEEKS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = generate_box_scores(args.teams, args.seasons, args.weeks, seed=args.seed)
+    if args.out.endswith(".csv"):
+        df.to_csv(args.out, index=False)
+    else:
+        df.to_excel(args.out, sheet_name="cleaned", index=False)
+    print(f"[OK] Wrote {len(df)} games to {args.out}")
@@ -2,11 +2,268 @@ import sqlite3
 
 DB_PATH = "cfb_stats.db"
 
-def create_database():
-    conn = sqlite3.connect(DB_PATH)
+# Per-connection performance profile shared by every script
+CONNECTION_PRAGMAS = [
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",    # 64 MB page cache
+    "PRAGMA mmap_size = 268435456",  # 256 MB memory-mapped I/O
+    "PRAGMA temp_store = MEMORY",
+]
+
+# Indexes matched to the stage queries:
+#   games: "WHERE game_type = 'regular' ORDER BY season, week" (fillRanks, fillElo) and season/week lookups (testDB)
+#   team_game_stats: per-team joins (testDB)
+#   rolling_team_stats: per-week grouping and Elo ordering (eloCheck, eloCheck2, elorankDisplay, rankCheck)
+INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_games_type_season_week
+        ON games (game_type, season, week);
+    CREATE INDEX IF NOT EXISTS idx_games_season_week_type
+        ON games (season, week, game_type);
+    CREATE INDEX IF NOT EXISTS idx_team_game_stats_team
+        ON team_game_stats (team_id, game_id);
+    CREATE INDEX IF NOT EXISTS idx_rolling_season_week_elo
+        ON rolling_team_stats (season, week, rolling_elo DESC, team_id);
+"""
+
+# Incremental-update state: last processed (season, week) per stage, plus per-team carry-over
+STATE_TABLES = """
+    CREATE TABLE IF NOT EXISTS stage_watermarks (
+        stage TEXT PRIMARY KEY,
+        season INTEGER,
+        week INTEGER,
+        games_seen INTEGER,
+        stats_seen INTEGER,
+        params TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS rolling_accumulators (
+        team_id INTEGER PRIMARY KEY,
+        games REAL, has_stats REAL, has_stats_opp REAL,
+        rolling_pass_yards_for_sum REAL, rolling_pass_yards_for_n REAL,
+        rolling_rush_yards_for_sum REAL, rolling_rush_yards_for_n REAL,
+        rolling_total_yards_for_sum REAL, rolling_total_yards_for_n REAL,
+        rolling_points_scored_sum REAL, rolling_points_scored_n REAL,
+        rolling_pass_yards_against_sum REAL, rolling_pass_yards_against_n REAL,
+        rolling_rush_yards_against_sum REAL, rolling_rush_yards_against_n REAL,
+        rolling_total_yards_against_sum REAL, rolling_total_yards_against_n REAL,
+        rolling_points_allowed_sum REAL, rolling_points_allowed_n REAL
+    );
+
+    CREATE TABLE IF NOT EXISTS elo_state (
+        team_id INTEGER PRIMARY KEY,
+        elo REAL
+    );
+"""
+
+# Rolling stats over other windows (season-to-date, last N games, exponential decay), one row set per window
+WINDOW_TABLES = """
+    CREATE TABLE IF NOT EXISTS rolling_window_stats (
+        window_name TEXT,
+        team_id INTEGER,
+        season INTEGER,
+        week INTEGER,
+        rolling_pass_yards_for REAL,
+        rolling_rush_yards_for REAL,
+        rolling_total_yards_for REAL,
+        rolling_points_scored REAL,
+        rolling_pass_yards_against REAL,
+        rolling_rush_yards_against REAL,
+        rolling_total_yards_against REAL,
+        rolling_points_allowed REAL,
+        pass_yards_for_rank INTEGER,
+        rush_yards_for_rank INTEGER,
+        total_yards_for_rank INTEGER,
+        points_scored_rank INTEGER,
+        pass_yards_against_rank INTEGER,
+        rush_yards_against_rank INTEGER,
+        total_yards_against_rank INTEGER,
+        points_allowed_rank INTEGER,
+        PRIMARY KEY (window_name, team_id, season, week)
+    );
+    CREATE INDEX IF NOT EXISTS idx_window_season_week
+        ON rolling_window_stats (window_name, season, week);
+"""
+
+# Massey and Colley ratings, written next to rolling_elo
+COMPUTER_RATINGS = """
+    ALTER TABLE rolling_team_stats ADD COLUMN rolling_massey REAL;
+    ALTER TABLE rolling_team_stats ADD COLUMN rolling_colley REAL;
+    ALTER TABLE rolling_team_stats ADD COLUMN massey_rank INTEGER;
+    ALTER TABLE rolling_team_stats ADD COLUMN colley_rank INTEGER;
+"""
+
+# What the pipeline runner last ran for each stage, so unchanged stages can be skipped
+PIPELINE_TABLES = """
+    CREATE TABLE IF NOT EXISTS pipeline_stages (
+        stage TEXT PRIMARY KEY,
+        input_hash TEXT,
+        output_signature TEXT,
+        seconds REAL,
+        finished_at TEXT
+    );
+"""
+
+# Team-in-week lookups (statsLookup): the UNIQUE (season, week, home_team_id, away_team_id) index serves the
+# home side, this one the away side, so neither scans the week's games
+GAME_TEAM_INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_games_season_week_away
+        ON games (season, week, away_team_id);
+"""
+
+# Change stamps for the source tables: the first row inserted, updated or deleted after a stamp was read clears
+# it (later rows find it already cleared and skip the write), and source_stamps() draws a fresh one on the next
+# read, so the season store and the pipeline's input hashes see any edit with one small read
+STAMPED_TABLES = ["teams", "games", "team_game_stats"]
+
+def _stamp_triggers(table):
+    return f"""
+    INSERT OR IGNORE INTO table_stamps VALUES ('{table}', NULL);
+""" + "".join(f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_stamp_{event.lower()} AFTER {event} ON {table}
+    WHEN (SELECT stamp FROM table_stamps WHERE table_name = '{table}') IS NOT NULL
+    BEGIN
+        UPDATE table_stamps SET stamp = NULL WHERE table_name = '{table}';
+    END;
+""" for event in ("INSERT", "UPDATE", "DELETE"))
+
+CHANGE_STAMPS = """
+    CREATE TABLE IF NOT EXISTS table_stamps (
+        table_name TEXT PRIMARY KEY,
+        stamp INTEGER
+    );
+""" + "".join(_stamp_triggers(table) for table in STAMPED_TABLES)
+
+# rolling_team_stats gets a stamp too, for the feature matrix; it is left out of source_stamps()' default tables
+# so rating writes don't rebuild the season store
+RATING_STAMPS = _stamp_triggers("rolling_team_stats")
+
+# Any change to a game or box score at or before a stage's watermark drops that watermark, so the stage's next
+# incremental run rebuilds instead of trusting rows computed from the old history (appended weeks leave it alone)
+def _watermark_guard(table, event, row, week_of):
+    return f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_watermark_{event.lower()}_{row.lower()} AFTER {event} ON {table}
+    WHEN EXISTS (SELECT 1 FROM stage_watermarks WHERE (season, week) >= {week_of})
+    BEGIN
+        DELETE FROM stage_watermarks WHERE (season, week) >= {week_of};
+    END;
+"""
+
+WATERMARK_GUARDS = "".join(
+    _watermark_guard("games", event, row, f"({row}.season, {row}.week)")
+    for event, rows in (("INSERT", ["NEW"]), ("UPDATE", ["OLD", "NEW"]), ("DELETE", ["OLD"])) for row in rows
+) + "".join(
+    _watermark_guard("team_game_stats", event, row, f"(SELECT season, week FROM games WHERE game_id = {row}.game_id)")
+    for event, rows in (("INSERT", ["NEW"]), ("UPDATE", ["OLD", "NEW"]), ("DELETE", ["OLD"])) for row in rows
+)
+
+# Schema version (PRAGMA user_version) -> SQL that upgrades the previous version to it
+MIGRATIONS = {
+    1: INDEXES,
+    2: STATE_TABLES,
+    3: WINDOW_TABLES,
+    4: COMPUTER_RATINGS,
+    5: PIPELINE_TABLES,
+    6: GAME_TEAM_INDEXES,
+    7: CHANGE_STAMPS,
+    8: WATERMARK_GUARDS,
+    9: RATING_STAMPS,
+}
+SCHEMA_VERSION = max(MIGRATIONS)
+
+def migrate_database(conn):
+    # Bring an existing database up to SCHEMA_VERSION without rebuilding it
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target in sorted(v for v in MIGRATIONS if v > version):
+        conn.executescript(MIGRATIONS[target])
+        conn.execute(f"PRAGMA user_version = {target}")
+        conn.commit()
+    if version < SCHEMA_VERSION:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("ANALYZE")
+    return version
+
+def connect(db_path=DB_PATH, migrate=True, **kwargs):
+    # Shared connection factory: tuned pragmas, plus schema migration on first use.
+    # The long busy timeout lets pipeline stages that run side by side queue for the write lock.
+    kwargs.setdefault("timeout", 120)
+    conn = sqlite3.connect(db_path, **kwargs)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    if migrate and conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'rolling_team_stats'").fetchone():
+        migrate_database(conn)
+    return conn
+
+def read_watermark(conn, stage):
+    # (season, week, games_seen, stats_seen, params) of the last processed week, or None
+    return conn.execute(
+        "SELECT season, week, games_seen, stats_seen, params FROM stage_watermarks WHERE stage = ?", (stage,)
+    ).fetchone()
+
+def write_watermark(conn, stage, season, week, params="", seen=None):
+    # Record the last processed week along with how many regular games/stat rows it covered
+    # (seen: those counts, when the caller already keeps a running total)
+    games_seen, stats_seen = seen or count_through(conn, season, week)
+    conn.execute(
+        "INSERT OR REPLACE INTO stage_watermarks VALUES (?, ?, ?, ?, ?, ?)",
+        (stage, int(season), int(week), games_seen, stats_seen, params))
+
+def clear_watermark(conn, stage):
+    conn.execute("DELETE FROM stage_watermarks WHERE stage = ?", (stage,))
+
+def count_through(conn, season, week, after=(0, 0)):
+    # Regular games and their stat rows up to and including (season, week), and after `after`
+    return conn.execute("""
+        SELECT COUNT(DISTINCT g.game_id), COUNT(s.game_id)
+        FROM games g
+        LEFT JOIN team_game_stats s ON s.game_id = g.game_id
+        WHERE g.game_type = 'regular' AND (g.season, g.week) <= (?, ?) AND (g.season, g.week) > (?, ?)
+    """, (int(season), int(week), int(after[0]), int(after[1]))).fetchone()
+
+def usable_watermark(conn, stage, params=""):
+    # The stored watermark, unless the history behind it or the stage parameters have changed since
+    mark = read_watermark(conn, stage)
+    if mark is None:
+        return None
+    season, week, games_seen, stats_seen, old_params = mark
+    if old_params != params or count_through(conn, season, week) != (games_seen, stats_seen):
+        return None
+    return season, week
+
+def source_stamps(conn, tables=STAMPED_TABLES):
+    # {table: stamp} for the given stamped tables; tables changed since their stamp was last read get a fresh
+    # random one. Commits, so call it outside other work's transactions
+    if conn.execute("SELECT 1 FROM table_stamps WHERE stamp IS NULL").fetchone():
+        conn.execute("UPDATE table_stamps SET stamp = random() WHERE stamp IS NULL")
+        conn.commit()
+    stamps = dict(conn.execute("SELECT table_name, stamp FROM table_stamps ORDER BY table_name"))
+    return {table: stamps[table] for table in sorted(tables)}
+
+def bulk_update(conn, table, keys, columns, rows):
+    # Stage (keys + columns) rows, keys unique, in a temp table and apply them with one set-based UPDATE.
+    # Returns how many rows of `table` were updated.
+    staging = f"{table}_updates"
+    conn.execute(f"DROP TABLE IF EXISTS temp.{staging}")
+    conn.execute(f"CREATE TEMP TABLE {staging} ({', '.join(keys + columns)})")
+    conn.executemany(f"INSERT INTO temp.{staging} VALUES ({', '.join('?' * (len(keys) + len(columns)))})", rows)
+    updated = conn.execute(f"""
+        UPDATE {table} AS t SET {", ".join(f"{c} = s.{c}" for c in columns)}
+        FROM temp.{staging} AS s
+        WHERE {" AND ".join(f"t.{k} = s.{k}" for k in keys)}
+    """).rowcount
+    conn.execute(f"DROP TABLE temp.{staging}")
+    return updated
+
+def create_database(db_path=DB_PATH):
+    conn = connect(db_path, migrate=False)
     cur = conn.cursor()
 
     cur.executescript("""
+    DROP TABLE IF EXISTS pipeline_stages;
+    DROP TABLE IF EXISTS table_stamps;
+    DROP TABLE IF EXISTS rolling_window_stats;
+    DROP TABLE IF EXISTS stage_watermarks;
+    DROP TABLE IF EXISTS rolling_accumulators;
+    DROP TABLE IF EXISTS elo_state;
     DROP TABLE IF EXISTS rolling_team_stats;
     DROP TABLE IF EXISTS team_game_stats;
     DROP TABLE IF EXISTS games;
@@ -79,10 +336,21 @@ def create_database():
         PRIMARY KEY (team_id, season, week)
     );
     """)
+    for version in sorted(MIGRATIONS):
+        cur.executescript(MIGRATIONS[version])
+    cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    cur.execute("PRAGMA journal_mode = WAL")
 
     conn.commit()
     conn.close()
-    print(f"Database initialized and tables created at {DB_PATH}.")
+    print(f"Database initialized and tables created at {db_path}.")
 
 if __name__ == "__main__":
-    create_database()
+    import sys
+    if "--migrate" in sys.argv:
+        conn = sqlite3.connect(DB_PATH)
+        old_version = migrate_database(conn)
+        conn.close()
+        print(f"Database at {DB_PATH} migrated from schema v{old_version} to v{SCHEMA_VERSION}.")
+    else:
+        create_database()
@@ -0,0 +1,120 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+def add_arguments(parser, report=True):
+    # The flags from_argv reads, for scripts that parse their command line with argparse
+    parser.add_argument("--profile", action="store_true", help="cProfile the run into the run report")
+    parser.add_argument("--trace-memory", action="store_true", help="record tracemalloc peaks in the run report")
+    if report:
+        parser.add_argument("--report", default=None, metavar="PATH", help="write the JSON run report here")
+
+class RunMetrics:
+    # Stage/season timers, counters, optional cProfile + tracemalloc, and a JSON run report
+
+    def __init__(self, name, verbose=True, profile=False, trace_memory=False, report_path=None):
+        self.name = name
+        self.verbose = verbose
+        self.report_path = report_path
+        self.counters = Counter()
+        self.stages = {}
+        self.seasons = {}
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self._profiler = cProfile.Profile() if profile else None
+        self._trace_memory = trace_memory
+        if self._profiler:
+            self._profiler.enable()
+        if trace_memory:
+            tracemalloc.start()
+
+    @classmethod
+    def from_argv(cls, name, verbose=True, argv=None):
+        # --profile, --trace-memory and --report PATH, read from the script's command line
+        argv = sys.argv if argv is None else argv
+        report_path = argv[argv.index("--report") + 1] if "--report" in argv[:-1] else None
+        return cls(name, verbose=verbose, profile="--profile" in argv,
+                   trace_memory="--trace-memory" in argv, report_path=report_path)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    @contextmanager
+    def season(self, season):
+        # Times one season; progress goes out as a single line when it finishes
+        start = time.perf_counter()
+        before = Counter(self.counters)
+        try:
+            yield
+        finally:
+            delta = {k: v - before.get(k, 0) for k, v in self.counters.items() if v != before.get(k, 0)}
+            self.seasons[int(season)] = {'seconds': round(time.perf_counter() - start, 4), **delta}
+            self.season_progress(season)
+
+    def add_stage(self, name, seconds):
+        # For stages timed elsewhere, e.g. in a worker process
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name, n=1):
+        self.counters[name] += int(n)
+
+    def season_counts(self, season, **counts):
+        # For vectorized stages: attribute counters to a season after the fact
+        entry = self.seasons.setdefault(int(season), {})
+        for name, n in counts.items():
+            entry[name] = entry.get(name, 0) + int(n)
+            self.count(name, n)
+
+    def season_progress(self, season):
+        entry = dict(self.seasons.get(int(season), {}))
+        seconds = entry.pop('seconds', None)
+        line = f"Season {season}: " + ", ".join(f"{v} {k.replace('_', ' ')}" for k, v in entry.items())
+        self.progress(line + (f" ({seconds:.2f}s)" if seconds is not None else ""))
+
+    def progress(self, message):
+        if self.verbose:
+            print(f"  [OK] {message}")
+
+    def report(self):
+        # Stop profiling, then return (and optionally write) the run report
+        result = {
+            'run': self.name,
+            'started': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            'seconds': round(time.perf_counter() - self._start, 4),
+            'stages': {k: round(v, 4) for k, v in self.stages.items()},
+            'seasons': self.seasons,
+            'counters': dict(self.counters),
+        }
+        if self._profiler:
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(25)
+            result['profile'] = out.getvalue()
+            self._profiler = None
+        if self._trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            result['memory'] = {
+                'current_mb': round(current / 2 ** 20, 2),
+                'peak_mb': round(peak / 2 ** 20, 2),
+                'top': [str(stat) for stat in tracemalloc.take_snapshot().statistics("lineno")[:10]],
+            }
+            tracemalloc.stop()
+
+        if self.report_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.report_path)), exist_ok=True)
+            with open(self.report_path, "w") as f:
+                json.dump(result, f, indent=2)
+            print(f"[OK] Run report written to {self.report_path}")
+        return result
@@ -0,0 +1,250 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+from createDB import connect, source_stamps, DB_PATH
+
+STORE_VERSION = 1
+
+# team_game_stats columns kept per side of every game, as home_<col> / away_<col>
+BOX_COLUMNS = [
+    "first_downs", "third_down_comp", "third_down_att", "fourth_down_comp", "fourth_down_att",
+    "pass_comp", "pass_att", "pass_yards", "rush_att", "rush_yards", "total_yards",
+    "fumbles", "interceptions", "pen_num", "pen_yards", "possession_time",
+]
+GAME_COLUMNS = ["season", "week", "score_home", "score_away"]
+
+def store_path(db_path):
+    return os.path.splitext(db_path)[0] + ".store"
+
+def fingerprint(conn):
+    # Change stamps of the source tables (see createDB.CHANGE_STAMPS), so any load, delete or edit of teams, games
+    # or team_game_stats changes it
+    return "|".join(f"{table}={stamp}" for table, stamp in source_stamps(conn).items()) + f"|v{STORE_VERSION}"
+
+def compact_int(values):
+    # Smallest signed int dtype holding the column; NULLs become the dtype's minimum (the sentinel)
+    values = np.asarray(values, dtype=np.float64)
+    present = values[~np.isnan(values)]
+    lo, hi = (present.min(), present.max()) if present.size else (0, 0)
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if info.min < lo and hi <= info.max:
+            return np.where(np.isnan(values), info.min, values).astype(dtype)
+    raise ValueError("integer column out of range")
+
+def build_store(db_path=DB_PATH, path=None):
+    # Read games and box scores once into typed, dense-indexed column arrays on disk
+    path = path or store_path(db_path)
+    conn = connect(db_path)
+    signature = fingerprint(conn)
+    teams = pd.read_sql_query("SELECT team_id, team_name FROM teams ORDER BY team_id", conn)
+    games = pd.read_sql_query(
+        "SELECT game_id, season, week, game_type, home_team_id, away_team_id, score_home, score_away "
+        "FROM games ORDER BY season, week, game_id", conn)
+    stats = pd.read_sql_query(f"SELECT game_id, team_id, {', '.join(BOX_COLUMNS)} FROM team_game_stats", conn)
+    conn.close()
+
+    team_ids = np.union1d(teams['team_id'].to_numpy(np.int64),
+                          np.concatenate([games['home_team_id'], games['away_team_id']]).astype(np.int64))
+    names = dict(zip(teams['team_id'], teams['team_name']))
+    game_types, type_codes = np.unique(games['game_type'].fillna(""), return_inverse=True)
+
+    columns = {
+        'game_id': games['game_id'].to_numpy(np.int32),
+        'game_type': type_codes.astype(np.int8),
+        'home': compact_int(np.searchsorted(team_ids, games['home_team_id'])),
+        'away': compact_int(np.searchsorted(team_ids, games['away_team_id'])),
+        'team_ids': compact_int(team_ids),
+    }
+    for col in GAME_COLUMNS:
+        columns[col] = compact_int(games[col])
+
+    # Box scores aligned to games, one column per side; has_*_stats separates a missing row from NULL values
+    for side in ("home", "away"):
+        box = games[['game_id', f"{side}_team_id"]].merge(
+            stats.rename(columns={'team_id': f"{side}_team_id"}).assign(_row=True),
+            on=['game_id', f"{side}_team_id"], how='left')
+        columns[f"has_{side}_stats"] = box['_row'].notna().to_numpy()
+        for col in BOX_COLUMNS:
+            if col == "possession_time":
+                columns[f"{side}_{col}"] = box[col].to_numpy(np.float32)
+            else:
+                columns[f"{side}_{col}"] = compact_int(box[col])
+
+    # Offsets: games of week i are rows week_offsets[i]:week_offsets[i + 1]
+    keys = games[['season', 'week']].to_numpy(np.int64)
+    starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)]) if len(keys) else np.array([], np.int64)
+    columns['week_keys'] = compact_int(keys[starts].reshape(-1, 2))
+    columns['week_offsets'] = np.r_[starts, len(keys)].astype(np.int64)
+    season_starts = starts[np.r_[True, keys[starts[1:], 0] != keys[starts[:-1], 0]]] if len(starts) else starts
+    columns['season_offsets'] = np.r_[season_starts, len(keys)].astype(np.int64)
+
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".building-")
+    os.chmod(tmp, 0o755)
+    for name, values in columns.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), values)
+    manifest = {
+        'fingerprint': signature,
+        'columns': sorted(columns),
+        'game_types': game_types.tolist(),
+        'team_names': [names.get(int(t)) for t in team_ids],
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+
+    if os.path.exists(path):
+        shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # Another process finished the same build first
+        shutil.rmtree(tmp, ignore_errors=True)
+    return SeasonStore(path)
+
+def load_store(db_path=DB_PATH, path=None, rebuild=False, verbose=False):
+    # The store for db_path, rebuilt first if the database changed since it was written
+    path = path or store_path(db_path)
+    if not rebuild and os.path.exists(os.path.join(path, "manifest.json")):
+        store = SeasonStore(path)
+        conn = connect(db_path)
+        current = fingerprint(conn)
+        conn.close()
+        if store.manifest['fingerprint'] == current:
+            return store
+    if verbose:
+        print(f"[LOADING] Building season store at {path}")
+    return build_store(db_path, path)
+
+def season_chunks(conn, after=(0, 0), columns=BOX_COLUMNS, through=None):
+    # (season, games, team_game_stats) for each season after `after`, read from SQL one season at a time, in the
+    # store's games_frame / team_game_stats_frame shapes; memory stays at one season however long the history is.
+    # columns=None skips the box scores (team_game_stats comes back as None); through: last (season, week) read
+    through = through or (2 ** 31, 0)
+    seasons = [season for (season,) in conn.execute(
+        "SELECT DISTINCT season FROM games WHERE game_type = 'regular' AND season BETWEEN ? AND ? ORDER BY season",
+        (int(after[0]), int(through[0])))]
+    where = "g.game_type = 'regular' AND g.season = ? AND (g.season, g.week) > (?, ?) AND (g.season, g.week) <= (?, ?)"
+    for season in seasons:
+        params = (season, int(after[0]), int(after[1]), int(through[0]), int(through[1]))
+        games = pd.read_sql_query(f"""
+            SELECT g.game_id, g.season, g.week, g.home_team_id, g.away_team_id, g.score_home, g.score_away
+            FROM games g WHERE {where} ORDER BY g.week, g.game_id
+        """, conn, params=params)
+        if games.empty:
+            continue
+        games = games.astype({'game_id': np.int64, 'season': np.int64, 'week': np.int64, 'home_team_id': np.int64,
+                              'away_team_id': np.int64, 'score_home': np.float64, 'score_away': np.float64})
+
+        team_game_stats = None
+        if columns is not None:
+            sides = []
+            for side, is_home in (("home", True), ("away", False)):
+                frame = pd.read_sql_query(f"""
+                    SELECT g.game_id, s.team_id{"".join(f", s.{c}" for c in columns)}
+                    FROM games g JOIN team_game_stats s ON s.game_id = g.game_id AND s.team_id = g.{side}_team_id
+                    WHERE {where} ORDER BY g.week, g.game_id
+                """, conn, params=params)
+                frame.insert(2, 'is_home', is_home)
+                sides.append(frame.astype({'game_id': np.int64, 'team_id': np.int64, **{c: np.float64 for c in columns}}))
+            team_game_stats = pd.concat(sides, ignore_index=True)
+        yield season, games, team_game_stats
+
+class SeasonStore:
+    # Memory-mapped columns plus helpers that rebuild the frames the stages used to read from SQL
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self._arrays = {}
+
+    def __getitem__(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+        return self._arrays[name]
+
+    def column(self, name, rows=slice(None)):
+        # float64 copy with NULL sentinels as NaN
+        values = self[name][rows]
+        if values.dtype.kind == 'i':
+            return np.where(values == np.iinfo(values.dtype).min, np.nan, values.astype(np.float64))
+        return values.astype(np.float64)
+
+    @property
+    def team_ids(self):
+        return self['team_ids'].astype(np.int64)
+
+    @property
+    def team_names(self):
+        return self.manifest['team_names']
+
+    def teams_frame(self):
+        return pd.DataFrame({'team_id': self.team_ids, 'team_name': self.team_names})
+
+    def start_after(self, after=(0, 0)):
+        # First game row after (season, week)
+        keys = self['week_keys']
+        i = np.searchsorted(keys[:, 0].astype(np.int64) * 1000 + keys[:, 1], after[0] * 1000 + after[1], side='right')
+        return int(self['week_offsets'][i])
+
+    def weeks(self, after=(0, 0)):
+        # (season, week, rows) for every week after `after`
+        keys, offsets = self['week_keys'], self['week_offsets']
+        start = self.start_after(after)
+        for i in range(len(keys)):
+            if offsets[i] >= start:
+                yield int(keys[i, 0]), int(keys[i, 1]), slice(int(offsets[i]), int(offsets[i + 1]))
+
+    def _rows(self, after, game_type):
+        rows = np.arange(self.start_after(after), len(self['game_id']))
+        if game_type is not None:
+            types = self.manifest['game_types']
+            code = types.index(game_type) if game_type in types else -1
+            rows = rows[self['game_type'][rows] == code]
+        return rows
+
+    def games_frame(self, after=(0, 0), game_type='regular'):
+        # Same columns and order as "SELECT ... FROM games WHERE game_type = ? ORDER BY season, week"
+        rows = self._rows(after, game_type)
+        team_ids = self.team_ids
+        frame = pd.DataFrame({
+            'game_id': self['game_id'][rows].astype(np.int64),
+            'season': self['season'][rows].astype(np.int64),
+            'week': self['week'][rows].astype(np.int64),
+            'home_team_id': team_ids[self['home'][rows]],
+            'away_team_id': team_ids[self['away'][rows]],
+        })
+        for col in ("score_home", "score_away"):
+            frame[col] = self.column(col, rows)
+        return frame
+
+    def team_game_stats_frame(self, after=(0, 0), game_type='regular', columns=BOX_COLUMNS):
+        # One row per existing team_game_stats row (home rows, then away rows), like a JOIN on games
+        rows = self._rows(after, game_type)
+        team_ids = self.team_ids
+        sides = []
+        for side, is_home in (("home", True), ("away", False)):
+            present = rows[self[f"has_{side}_stats"][rows]]
+            frame = pd.DataFrame({
+                'game_id': self['game_id'][present].astype(np.int64),
+                'team_id': team_ids[self[side][present]],
+                'is_home': is_home,
+            })
+            for col in columns:
+                frame[col] = self.column(f"{side}_{col}", present)
+            sides.append(frame)
+        return pd.concat(sides, ignore_index=True)
+
+    def nbytes(self):
+        return sum(self[name].nbytes for name in self.manifest['columns'])
+
+# Run it (--rebuild forces a fresh store)
+if __name__ == "__main__":
+    db_path = next((a for a in sys.argv[1:] if not a.startswith("--")), DB_PATH)
+    store = load_store(db_path, rebuild="--rebuild" in sys.argv, verbose=True)
+    print(f"[OK] Season store at {store.path}: {len(store['game_id'])} games, "
+          f"{len(store['week_keys'])} weeks, {store.nbytes() / 2 ** 20:.1f} MB.")
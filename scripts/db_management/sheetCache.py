@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from pandas._libs.parsers import STR_NA_VALUES
+
+CACHE_DIR = "../../data/.cache"
+CHUNK_ROWS = 50_000
+
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _cache_path(cache_dir, sheet_name, digest):
+    return os.path.join(cache_dir, f"{sheet_name}-{digest[:16]}")
+
+def _cell(value):
+    # Match read_excel: integral floats come back as ints, and its default NA markers ("", "n/a", "NULL", ...) as
+    # missing, so a column holding them keeps its numeric kind
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value in STR_NA_VALUES:
+        return None
+    return value
+
+def stream_sheet(data_path, sheet_name, chunk_rows=None):
+    # Read the sheet in read-only mode, a chunk of rows at a time
+    from openpyxl import load_workbook
+    chunk_rows = chunk_rows or CHUNK_ROWS
+
+    wb = load_workbook(data_path, read_only=True, data_only=True)
+    try:
+        rows = wb[sheet_name].iter_rows(values_only=True)
+        header = [str(h) for h in next(rows)]
+        chunk, emitted = [], False
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            chunk.append([_cell(v) for v in row])
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame.from_records(chunk, columns=header)
+                chunk, emitted = [], True
+        if chunk or not emitted:
+            yield pd.DataFrame.from_records(chunk, columns=header)
+    finally:
+        wb.close()
+
+class ColumnWriter:
+    # One sheet column appended to a raw file chunk by chunk. Kinds follow pd.concat: int + float -> float, any
+    # other mix -> object, stored as int32 codes into a category table grown as new values arrive. All-NA chunks
+    # are only counted until the column's kind is known.
+    def __init__(self, path):
+        self.path = path
+        self.kind = None
+        self.rows = 0
+        self.pending_na = 0
+        self.categories = {}
+
+    def append(self, col):
+        if col.isna().all():
+            self.pending_na += len(col)
+            return
+        numeric = pd.api.types.is_numeric_dtype(col) or pd.api.types.is_datetime64_any_dtype(col)
+        kind = col.dtype.str if numeric and col.dtype != object else "object"
+        if self.kind is None:
+            self.kind = kind
+        elif kind != self.kind and self.kind != "object":
+            self._convert("<f8" if {kind, self.kind} == {"<i8", "<f8"} else "object")
+        self._flush_na()
+        self._write(col)
+
+    def _flush_na(self):
+        # NAs can't be stored as int or bool, so those columns widen first (as pd.concat would)
+        if not self.pending_na:
+            return
+        if self.kind in ("<i8", "|b1"):
+            self._convert("<f8" if self.kind == "<i8" else "object")
+        n, self.pending_na = self.pending_na, 0
+        if self.kind == "object":
+            self._append_raw(np.full(n, -1, dtype=np.int32))
+        else:
+            self._append_raw(np.full(n, np.datetime64("NaT") if self.kind.startswith("<M") else np.nan,
+                                     dtype=np.dtype(self.kind)))
+
+    def _write(self, col):
+        if self.kind == "object":
+            codes, uniques = pd.factorize(col.astype(object), use_na_sentinel=True)
+            table = np.array([self.categories.setdefault(u, len(self.categories)) for u in uniques.tolist()] + [-1],
+                             dtype=np.int32)
+            self._append_raw(table[codes])
+        else:
+            self._append_raw(col.to_numpy(np.dtype(self.kind)))
+
+    def _append_raw(self, values):
+        with open(self.path, "ab") as f:
+            f.write(np.ascontiguousarray(values).tobytes())
+        self.rows += len(values)
+
+    def _convert(self, kind):
+        # Re-encode what was written so far as `kind` (only numeric kinds ever convert), a block at a time
+        rows, old_dtype = self.rows, np.dtype(self.kind)
+        self.kind, self.rows = kind, 0
+        if not rows:
+            return
+        os.replace(self.path, self.path + ".old")
+        old = np.memmap(self.path + ".old", dtype=old_dtype, mode="r", shape=(rows,))
+        for start in range(0, rows, CHUNK_ROWS):
+            self._write(pd.Series(np.array(old[start:start + CHUNK_ROWS])))
+        del old
+        os.remove(self.path + ".old")
+
+    def finish(self, npy_path):
+        # Copy the raw values under a .npy header, a block at a time; returns the column's manifest extras
+        self.kind = self.kind or "object"
+        self._flush_na()
+        dtype = np.int32 if self.kind == "object" else np.dtype(self.kind)
+        out = np.lib.format.open_memmap(npy_path, mode="w+", dtype=dtype, shape=(self.rows,))
+        if self.rows:
+            raw = np.memmap(self.path, dtype=dtype, mode="r", shape=(self.rows,))
+            for start in range(0, self.rows, CHUNK_ROWS):
+                out[start:start + CHUNK_ROWS] = raw[start:start + CHUNK_ROWS]
+            del raw
+            os.remove(self.path)
+        out.flush()
+        del out
+        if self.kind != "object":
+            return {}
+        return {"categories": [c if isinstance(c, (str, int, float, bool)) else str(c) for c in self.categories]}
+
+def write_cache(chunks, path):
+    # One .npy file per column, written as chunks arrive so only one chunk is ever held in memory;
+    # text columns stored as int32 codes plus a category list
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(path), prefix=".building-")
+    os.chmod(tmp, 0o755)
+    names, writers = None, []
+    for chunk in chunks:
+        if names is None:
+            names = list(chunk.columns)
+            writers = [ColumnWriter(os.path.join(tmp, f"{i}.raw")) for i in range(len(names))]
+        for writer, name in zip(writers, names):
+            writer.append(chunk[name])
+
+    columns = []
+    for i, (name, writer) in enumerate(zip(names or [], writers)):
+        entry = {"name": name, "file": f"{i}.npy"}
+        entry.update(writer.finish(os.path.join(tmp, entry["file"])))
+        columns.append(entry)
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump({"rows": writers[0].rows if writers else 0, "columns": columns}, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
+def read_cache(path):
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+
+    data = {}
+    for entry in manifest["columns"]:
+        values = np.load(os.path.join(path, entry["file"]), mmap_mode="r")
+        if "categories" in entry:
+            categories = np.array(entry["categories"] + [np.nan], dtype=object)
+            values = pd.Series(categories[values]).infer_objects()
+        data[entry["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+def build_cache(data_path, sheet_name, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(cache_dir, sheet_name, file_hash(data_path))
+
+    write_cache(stream_sheet(data_path, sheet_name), path)
+
+    # Drop snapshots of older versions of the same sheet
+    prefix = f"{sheet_name}-"
+    for name in os.listdir(cache_dir):
+        stale = os.path.join(cache_dir, name)
+        if name.startswith(prefix) and stale != path:
+            shutil.rmtree(stale, ignore_errors=True)
+    return path
+
+def load_sheet(data_path, sheet_name, cache_dir=CACHE_DIR, verbose=True):
+    # Columnar snapshot of the sheet, rebuilt whenever the workbook's contents change
+    path = _cache_path(cache_dir, sheet_name, file_hash(data_path))
+    if not os.path.exists(os.path.join(path, "manifest.json")):
+        if verbose:
+            print(f"[LOADING] Building cache for '{sheet_name}' from {data_path}")
+        path = build_cache(data_path, sheet_name, cache_dir)
+    elif verbose:
+        print(f"[OK] Using cached '{sheet_name}' snapshot at {path}")
+    return read_cache(path)
+
+if __name__ == "__main__":
+    from fillDB import DATA_PATH, SHEET_NAME
+    print(f"[OK] Cache written to {build_cache(DATA_PATH, SHEET_NAME)}")
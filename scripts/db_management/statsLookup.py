@@ -0,0 +1,147 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from createDB import connect, DB_PATH
+
+POOL_SIZE = 4
+
+GAME_COLUMNS = ["game_type", "score_home", "score_away"]
+BOX_COLUMNS = ["is_home", "first_downs", "pass_yards", "rush_yards", "total_yards",
+               "fumbles", "interceptions", "possession_time"]
+STAT_COLUMNS = GAME_COLUMNS + BOX_COLUMNS
+
+# Every requested (team_id, season, week) key in one statement: the keys travel as one JSON array and are
+# joined set-wise (two index seeks per key, home side and away side), so the statement text never changes
+# and each pooled connection prepares it once
+BATCH_QUERY = f"""
+    WITH request(position, team_id, season, week) AS MATERIALIZED (
+        SELECT key, json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]')
+        FROM json_each(?)
+    ), matches AS (
+        SELECT r.*, g.game_id FROM request r
+        JOIN games g ON g.season = r.season AND g.week = r.week AND g.home_team_id = r.team_id
+        UNION ALL
+        SELECT r.*, g.game_id FROM request r
+        JOIN games g ON g.season = r.season AND g.week = r.week AND g.away_team_id = r.team_id
+        WHERE g.home_team_id <> r.team_id
+    )
+    SELECT m.position, m.team_id, m.season, m.week,
+           {", ".join(f"g.{c}" for c in GAME_COLUMNS)}, {", ".join(f"s.{c}" for c in BOX_COLUMNS)}
+    FROM matches m
+    JOIN games g ON g.game_id = m.game_id
+    JOIN team_game_stats s ON s.game_id = m.game_id AND s.team_id = m.team_id
+    ORDER BY m.position, m.game_id
+"""
+
+class StatsLookup:
+    # Batched team/week box-score lookups over a pool of read-only connections; safe to share across threads
+    def __init__(self, db_path=DB_PATH, pool_size=POOL_SIZE):
+        self.db_path = os.path.abspath(db_path)
+        self._pool = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(connect(f"file:{self.db_path}?mode=ro", migrate=False, uri=True, check_same_thread=False))
+        self._teams_lock = threading.Lock()
+        self._load_teams()
+
+    def _load_teams(self):
+        # (Re)read teams; the three maps are swapped in together so readers on other threads never see a mix
+        with self._connection() as conn:
+            rows = conn.execute("SELECT team_id, team_name FROM teams ORDER BY team_id").fetchall()
+        self._teams = ({name: team_id for team_id, name in rows},
+                       np.array([name for _, name in rows], dtype=object),
+                       {team_id: i for i, (team_id, _) in enumerate(rows)})
+
+    def _refresh_teams(self, seen):
+        # Reload after a miss, unless another thread already did since `seen` was read
+        with self._teams_lock:
+            if self._teams is seen:
+                self._load_teams()
+        return self._teams
+
+    @property
+    def team_ids(self):
+        return self._teams[0]
+
+    @property
+    def team_names(self):
+        return self._teams[1]
+
+    @contextmanager
+    def _connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def resolve(self, team):
+        # team_id for a team name or id; None for unknown names, which then match nothing. A name missing from
+        # the loaded teams reloads them first, so teams added since the lookup was built still resolve
+        if isinstance(team, (int, np.integer)):
+            return int(team)
+        teams = self._teams
+        if team not in teams[0]:
+            teams = self._refresh_teams(teams)
+        return teams[0].get(team)
+
+    def lookup(self, keys):
+        # keys: iterable of (team, season, week), team by name or team_id. Returns one DataFrame with a row per
+        # matching team-game; `position` is the key's index in `keys` (keys without a game are absent)
+        request = json.dumps([[self.resolve(team), int(season), int(week)] for team, season, week in keys])
+        with self._connection() as conn:
+            rows = conn.execute(BATCH_QUERY, (request,)).fetchall()
+
+        columns = ["position", "team_id", "season", "week", *STAT_COLUMNS]
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+        batch = pd.DataFrame({name: np.array(column) for name, column in zip(columns, values)}, columns=columns)
+        teams = self._teams
+        if not teams[2].keys() >= set(batch['team_id']):
+            teams = self._refresh_teams(teams)
+        _, team_names, name_of = teams
+        batch.insert(1, "team_name", team_names[[name_of[t] for t in batch['team_id']]]
+                     if len(batch) else np.array([], dtype=object))
+        return batch
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+@lru_cache(maxsize=8)
+def stats_lookup(db_path=DB_PATH):
+    # One shared lookup per database
+    return StatsLookup(db_path)
+
+# Run it (python statsLookup.py [db] — times 10k random lookups, serially and from a thread pool)
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DB_PATH
+    with StatsLookup(db_path) as lookup:
+        conn = connect(db_path, migrate=False)
+        pairs = conn.execute("""
+            SELECT s.team_id, g.season, g.week FROM team_game_stats s JOIN games g USING (game_id)
+            ORDER BY RANDOM() LIMIT 10000
+        """).fetchall()
+        conn.close()
+
+        start = time.perf_counter()
+        batch = lookup.lookup(pairs)
+        print(f"[OK] {len(pairs)} keys -> {len(batch)} rows in {time.perf_counter() - start:.3f}s")
+
+        chunks = [pairs[i:i + 500] for i in range(0, len(pairs), 500)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(POOL_SIZE) as pool:
+            rows = sum(len(b) for b in pool.map(lookup.lookup, chunks))
+        print(f"[OK] {len(chunks)} batches from {POOL_SIZE} threads -> {rows} rows in {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,130 @@
+import argparse
+import json
+import sys
+import time
+from createDB import connect, DB_PATH
+from runMetrics import RunMetrics, add_arguments
+
+RANK_COLUMNS = [
+    "pass_yards_for_rank", "rush_yards_for_rank", "total_yards_for_rank", "points_scored_rank",
+    "pass_yards_against_rank", "rush_yards_against_rank", "total_yards_against_rank", "points_allowed_rank",
+    "elo_rank"
+]
+
+# name -> (severity, description, SQL selecting the violating rows).
+# Every query is limited to (season, week) > (:season, :week) so a check after an incremental load only
+# touches the new weeks; SQLite does the counting and only a few sample rows come back.
+CHECKS = {
+    'null_ranks': ('error', "rolling_team_stats rows with a NULL rank", f"""
+        SELECT team_id, season, week FROM rolling_team_stats
+        WHERE (season, week) > (:season, :week)
+          AND ({" OR ".join(f"{c} IS NULL" for c in RANK_COLUMNS)})
+    """),
+    'ranks_out_of_range': ('error', "ranks below 1 or above the number of teams ranked that week", f"""
+        WITH sized AS (
+            SELECT r.*, COUNT(*) OVER (PARTITION BY season, week) AS n_ranked
+            FROM rolling_team_stats r
+            WHERE (season, week) > (:season, :week)
+        )
+        SELECT team_id, season, week, n_ranked FROM sized
+        WHERE {" OR ".join(f"{c} < 1 OR {c} > n_ranked" for c in RANK_COLUMNS)}
+    """),
+    'missing_team_game_stats': ('warning', "games without a home or away team_game_stats row", """
+        SELECT g.game_id, g.season, g.week, g.home_team_id, g.away_team_id,
+               h.game_id IS NOT NULL AS has_home, a.game_id IS NOT NULL AS has_away
+        FROM games g
+        LEFT JOIN team_game_stats h ON h.game_id = g.game_id AND h.team_id = g.home_team_id
+        LEFT JOIN team_game_stats a ON a.game_id = g.game_id AND a.team_id = g.away_team_id
+        WHERE (g.season, g.week) > (:season, :week)
+          AND (h.game_id IS NULL OR a.game_id IS NULL)
+    """),
+    'duplicate_pairings': ('error', "the same two teams scheduled more than once in a (season, week)", """
+        SELECT season, week, MIN(home_team_id, away_team_id) AS team_a, MAX(home_team_id, away_team_id) AS team_b,
+               COUNT(*) AS games
+        FROM games
+        WHERE (season, week) > (:season, :week)
+        GROUP BY season, week, team_a, team_b
+        HAVING COUNT(*) > 1
+    """),
+    'elo_without_game': ('error', "rolling_team_stats rows with an Elo but no regular-season game that week", """
+        SELECT r.team_id, r.season, r.week, r.rolling_elo FROM rolling_team_stats r
+        WHERE (r.season, r.week) > (:season, :week)
+          AND r.rolling_elo IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM games g
+              WHERE g.season = r.season AND g.week = r.week AND g.game_type = 'regular'
+                AND (g.home_team_id = r.team_id OR g.away_team_id = r.team_id))
+    """),
+}
+
+def latest_weeks_start(conn, n_weeks):
+    # The (season, week) just before the newest n_weeks ingested weeks
+    rows = conn.execute("""
+        SELECT DISTINCT season, week FROM games ORDER BY season DESC, week DESC LIMIT 1 OFFSET ?
+    """, (n_weeks,)).fetchall()
+    return tuple(rows[0]) if rows else (0, 0)
+
+def run_check(conn, name, after=(0, 0), samples=5):
+    severity, description, sql = CHECKS[name]
+    start = time.perf_counter()
+    cursor = conn.execute(f"SELECT *, COUNT(*) OVER () FROM ({sql}) LIMIT :samples",
+                          {'season': after[0], 'week': after[1], 'samples': samples})
+    columns = [c[0] for c in cursor.description[:-1]]
+    rows = cursor.fetchall()
+    return {
+        'check': name,
+        'severity': severity,
+        'description': description,
+        'passed': not rows,
+        'violations': rows[0][-1] if rows else 0,
+        'sample': [dict(zip(columns, row[:-1])) for row in rows],
+        'seconds': round(time.perf_counter() - start, 4),
+    }
+
+def validate_database(db_path=DB_PATH, since=None, latest=None, checks=None, samples=5, verbose=True, metrics=None):
+    # Run the checks (all by default) over weeks after `since`, or over the `latest` N ingested weeks
+    metrics = metrics or RunMetrics("validateDB", verbose=verbose)
+    conn = connect(db_path)
+    after = tuple(since) if since else latest_weeks_start(conn, latest) if latest else (0, 0)
+    results = []
+    for name in checks or CHECKS:
+        with metrics.stage(name):
+            results.append(run_check(conn, name, after, samples))
+        metrics.count("violations", results[-1]['violations'])
+    conn.close()
+
+    report = {
+        'db': db_path,
+        'after': {'season': after[0], 'week': after[1]},
+        'passed': all(r['passed'] for r in results if r['severity'] == 'error'),
+        'checks': results,
+    }
+    if verbose:
+        scope = f" after Season {after[0]}, Week {after[1]}" if after != (0, 0) else ""
+        print(f"[LOADING] Validating {db_path}{scope}")
+        for r in results:
+            tag = "[OK]" if r['passed'] else "[ERROR]" if r['severity'] == 'error' else "[WARNING]"
+            detail = "" if r['passed'] else f" — {r['violations']} found, e.g. {r['sample'][0]}"
+            print(f"  {tag} {r['check']}: {r['description']}{detail} ({r['seconds']:.3f}s)")
+        print("[OK] Database passed validation." if report['passed'] else "[ERROR] Database failed validation.")
+    return report
+
+# Run it (exit status 1 when an error-level check fails)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate SQL integrity checks over the stats database.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--since", type=int, nargs=2, metavar=("SEASON", "WEEK"), help="only check later weeks")
+    parser.add_argument("--latest", type=int, metavar="N", help="only check the newest N ingested weeks")
+    parser.add_argument("--checks", nargs="+", choices=list(CHECKS), default=None)
+    parser.add_argument("--samples", type=int, default=5, help="example rows kept per failing check")
+    parser.add_argument("--report", default=None, help="write the report (with the run report under 'run') as JSON")
+    add_arguments(parser, report=False)
+    args = parser.parse_args()
+    metrics = RunMetrics("validateDB", profile=args.profile, trace_memory=args.trace_memory)
+
+    report = validate_database(args.db, args.since, args.latest, args.checks, args.samples, metrics=metrics)
+    report['run'] = metrics.report()
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(0 if report['passed'] else 1)
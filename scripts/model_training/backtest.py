@@ -0,0 +1,193 @@
+import argparse
+import contextlib
+import os
+import sys
+import time
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, "..", "db_management"))
+sys.path.append(os.path.join(HERE, "..", "mrankings"))
+from createDB import connect
+from seasonStore import load_store
+from fillElo import build_game_arrays, play_week_arrays, season_slices
+from featureMatrix import GAME_COLUMNS, load_matrix
+from runMetrics import RunMetrics, add_arguments
+
+DB_PATH = "../db_management/cfb_stats.db"
+
+# Elo replays scored from their own pre-game expectations: (base_k, decay_factor, rank_divisor).
+# "elo" is fillElo as its main runs it; "elo_flat_k" drops the rank modifier from K.
+ELO_MODELS = {
+    'elo': (25, 0.97, 25),
+    'elo_flat_k': (25, 0.97, np.inf),
+}
+# Ratings read from rolling_team_stats, turned into probabilities by a logistic fit on earlier seasons only
+FITTED_MODELS = ['massey', 'colley', 'stats']
+MODELS = [*ELO_MODELS, *FITTED_MODELS]
+SNAPSHOT_FEATURES = [f"{side}_{name}" for side in ("home", "away")
+                     for name in ("points_scored", "points_allowed", "massey", "colley")]
+CALIBRATION_BINS = 10
+
+def load_snapshots(db_path=DB_PATH, rebuild=False, verbose=True):
+    # Completed games with both teams' pre-game state, from the cached feature matrix
+    snapshots = load_matrix(db_path, rebuild=rebuild, verbose=verbose).frame(GAME_COLUMNS + SNAPSHOT_FEATURES)
+    return snapshots.dropna(subset=['score_home', 'score_away']).reset_index(drop=True)
+
+def replay_season(task):
+    # Every Elo model's pre-game expectation for one season (Elo resets each season, so seasons run independently)
+    season, season_arrays, n_slots = task
+    expected = {}
+    for name, (base_k, decay_factor, rank_divisor) in ELO_MODELS.items():
+        current_elo = np.full(n_slots, 1500.0)
+        expected[name] = np.empty(season_arrays['home'].size)
+        for week in np.unique(season_arrays['week']):
+            idx = np.flatnonzero(season_arrays['week'] == week)
+            _, _, expected[name][idx] = play_week_arrays(
+                current_elo, season_arrays, idx, week, base_k, decay_factor, rank_divisor)
+    return pd.DataFrame({'game_id': season_arrays['game_id'], **expected})
+
+def replay_elo(db_path, workers=None, metrics=None):
+    games = load_store(db_path).games_frame()
+    conn = connect(db_path)
+    ranks = pd.read_sql_query(
+        "SELECT season, week, team_id, points_scored_rank, points_allowed_rank FROM rolling_team_stats", conn)
+    conn.close()
+    game_arrays = build_game_arrays(games, ranks)
+    n_slots = int(max(game_arrays['home'].max(initial=0), game_arrays['away'].max(initial=0))) + 1
+
+    tasks = [(season, season_arrays, n_slots) for season, season_arrays in season_slices(game_arrays)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    with Pool(workers) if workers > 1 else contextlib.nullcontext() as pool:
+        # Seasons come back in order, each reported as soon as its replay is done
+        replays = pool.imap(replay_season, tasks) if pool else map(replay_season, tasks)
+        results = []
+        for (season, _, _), result in zip(tasks, replays):
+            results.append(result)
+            if metrics is not None:
+                metrics.season_counts(season, games_replayed=len(result))
+                metrics.season_progress(season)
+    return pd.concat(results, ignore_index=True) if results else pd.DataFrame(columns=['game_id', *ELO_MODELS])
+
+def rating_differences(snapshots):
+    # Home-minus-away signal per fitted model (NaN when either side has no value yet)
+    home_points = (snapshots['home_points_scored'] + snapshots['away_points_allowed']) / 2
+    away_points = (snapshots['away_points_scored'] + snapshots['home_points_allowed']) / 2
+    return {
+        'massey': snapshots['home_massey'] - snapshots['away_massey'],
+        'colley': snapshots['home_colley'] - snapshots['away_colley'],
+        'stats': home_points - away_points,
+    }
+
+def fit_logistic(x, y, iterations=25):
+    # Intercept (home edge) and slope by Newton's method; (0, 0) without data
+    if x.size == 0:
+        return np.zeros(2)
+    X = np.column_stack([np.ones_like(x), x])
+    beta = np.zeros(2)
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-X @ beta))
+        hessian = X.T @ (X * (p * (1 - p))[:, None]) + 1e-9 * np.eye(2)
+        step = np.linalg.solve(hessian, X.T @ (y - p))
+        beta += step
+        if np.abs(step).max() < 1e-10:
+            break
+    return beta
+
+def walk_forward(snapshots, eval_seasons):
+    # Each evaluated season's probabilities come from a fit on the seasons before it
+    y = snapshots['home_win'].to_numpy()
+    seasons = snapshots['season'].to_numpy()
+    for name, diff in rating_differences(snapshots).items():
+        x = diff.to_numpy()
+        probs = np.full(x.size, np.nan)
+        for season in eval_seasons:
+            train = (seasons < season) & ~np.isnan(x)
+            intercept, slope = fit_logistic(x[train], y[train])
+            test = seasons == season
+            probs[test] = 1 / (1 + np.exp(-(intercept + slope * np.nan_to_num(x[test]))))
+        snapshots[name] = probs
+
+def score(p, y):
+    p = np.clip(p, 1e-15, 1 - 1e-15)
+    return {
+        'games': int(p.size),
+        'accuracy': float(np.mean((p > 0.5) == (y == 1))),
+        'log_loss': float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p))),
+        'brier': float(np.mean((p - y) ** 2)),
+    }
+
+def calibration(p, y, bins=CALIBRATION_BINS):
+    # Mean predicted vs observed home-win rate per probability bin
+    which = np.minimum((p * bins).astype(np.int64), bins - 1)
+    counts = np.bincount(which, minlength=bins)
+    with np.errstate(invalid='ignore'):
+        return pd.DataFrame({
+            'bin': [f"{b / bins:.1f}-{(b + 1) / bins:.1f}" for b in range(bins)],
+            'games': counts,
+            'predicted': np.bincount(which, p, bins) / counts,
+            'observed': np.bincount(which, y, bins) / counts,
+        })
+
+def run_backtest(db_path=DB_PATH, models=MODELS, eval_from=None, workers=None, rebuild=False, verbose=True,
+                 metrics=None):
+    metrics = metrics or RunMetrics("backtest", verbose=verbose)
+    with metrics.stage("load"):
+        snapshots = load_snapshots(db_path, rebuild=rebuild, verbose=verbose)
+    if snapshots.empty:
+        raise ValueError("No completed regular-season games to backtest")
+    snapshots['home_win'] = (snapshots['score_home'] > snapshots['score_away']).astype(np.float64)
+
+    seasons = np.unique(snapshots['season'])
+    if eval_from is None:
+        # Fitted models need a season of history, so scoring starts with the second season
+        eval_from = int(seasons[0]) + 1
+    eval_seasons = [int(s) for s in seasons if s >= eval_from]
+
+    if any(m in ELO_MODELS for m in models):
+        with metrics.stage("elo"):
+            snapshots = snapshots.merge(replay_elo(db_path, workers, metrics), on='game_id', how='left')
+    with metrics.stage("fit"):
+        walk_forward(snapshots, eval_seasons)
+
+    with metrics.stage("score"):
+        scored = snapshots[snapshots['season'].isin(eval_seasons)]
+        y = scored['home_win'].to_numpy()
+        summary = pd.DataFrame([{'model': m, **score(scored[m].to_numpy(), y)} for m in models])
+        by_season = pd.DataFrame([
+            {'model': m, 'season': season, **score(group[m].to_numpy(), group['home_win'].to_numpy())}
+            for m in models for season, group in scored.groupby('season')])
+        calibrations = {m: calibration(scored[m].to_numpy(), y) for m in models}
+    metrics.count("games_scored", len(scored))
+    return summary.sort_values('log_loss').reset_index(drop=True), by_season, calibrations
+
+# Run it
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of pre-game predictions from every rating system.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=MODELS)
+    parser.add_argument("--eval-from", type=int, default=None, help="first season scored (default: second season in the data)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the feature matrix from scratch")
+    parser.add_argument("--by-season", action="store_true", help="also print per-season scores")
+    parser.add_argument("--calibration", action="store_true", help="also print calibration tables")
+    parser.add_argument("--out", default=None, help="write per-season scores to this CSV")
+    add_arguments(parser)
+    args = parser.parse_args()
+    metrics = RunMetrics.from_argv("backtest")
+
+    start = time.perf_counter()
+    summary, by_season, calibrations = run_backtest(args.db, args.models, args.eval_from, args.workers, args.rebuild,
+                                                    metrics=metrics)
+    print(summary.round(4).to_string(index=False))
+    if args.by_season:
+        print("\n" + by_season.pivot(index='season', columns='model', values='log_loss').round(4).to_string())
+    if args.calibration:
+        for model, table in calibrations.items():
+            print(f"\n{model}\n" + table.round(3).to_string(index=False))
+    if args.out:
+        by_season.to_csv(args.out, index=False)
+    print(f"\n[OK] Backtest finished in {time.perf_counter() - start:.1f}s.")
+    metrics.report()
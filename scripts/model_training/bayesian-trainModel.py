@@ -0,0 +1,243 @@
+import argparse
+import glob
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_management"))
+from createDB import connect
+from runMetrics import RunMetrics, add_arguments
+
+DB_PATH = "../db_management/cfb_stats.db"
+CHECKPOINT_DIR = "../../models/bayesian"
+
+# Pre-game stat ranks used as features: (away rank - home rank) / 100 for each
+RANK_FEATURES = ["points_scored_rank", "points_allowed_rank", "total_yards_for_rank", "total_yards_against_rank"]
+
+# Parameter layout: [home field, feature weights..., team strengths indexed by team_id...]
+HOME = 0
+N_FIXED = 1 + len(RANK_FEATURES)
+
+# Gaussian priors and noise, all in points of scoring margin
+PRIORS = {
+    'team_sd': 14.0,
+    'home_mean': 2.5,
+    'home_sd': 2.0,
+    'feature_sd': 2.0,
+    'margin_sd': 16.0,
+    'week_drift_sd': 1.5,
+    'season_carryover': 0.75,
+    'season_drift_sd': 6.0,
+}
+
+def initial_state(n_teams, priors=PRIORS):
+    mean = np.zeros(N_FIXED + n_teams)
+    var = np.full(N_FIXED + n_teams, priors['team_sd'] ** 2)
+    mean[HOME], var[HOME] = priors['home_mean'], priors['home_sd'] ** 2
+    var[1:N_FIXED] = priors['feature_sd'] ** 2
+    return {'mean': mean, 'var': var, 'season': 0, 'week': 0}
+
+def ensure_capacity(state, max_team_id, priors=PRIORS):
+    # New teams enter at the prior
+    missing = N_FIXED + max_team_id + 1 - state['mean'].size
+    if missing > 0:
+        state['mean'] = np.concatenate([state['mean'], np.zeros(missing)])
+        state['var'] = np.concatenate([state['var'], np.full(missing, priors['team_sd'] ** 2)])
+
+def stream_weeks(conn, after=(0, 0)):
+    # Yield one week of completed regular-season games at a time, in (season, week) order
+    home_ranks = ", ".join(f"hr.{c}" for c in RANK_FEATURES)
+    away_ranks = ", ".join(f"ar.{c}" for c in RANK_FEATURES)
+    cursor = conn.execute(f"""
+        SELECT g.season, g.week, g.home_team_id, g.away_team_id, g.score_home - g.score_away,
+               {home_ranks}, {away_ranks}
+        FROM games g
+        LEFT JOIN rolling_team_stats hr
+            ON hr.team_id = g.home_team_id AND hr.season = g.season AND hr.week = g.week
+        LEFT JOIN rolling_team_stats ar
+            ON ar.team_id = g.away_team_id AND ar.season = g.season AND ar.week = g.week
+        WHERE g.game_type = 'regular'
+          AND g.score_home IS NOT NULL AND g.score_away IS NOT NULL
+          AND (g.season, g.week) > (?, ?)
+        ORDER BY g.season, g.week
+    """, after)
+
+    week_rows, current = [], None
+    for row in cursor:
+        if row[:2] != current and week_rows:
+            yield _week_arrays(current, week_rows)
+            week_rows = []
+        current = row[:2]
+        week_rows.append(row)
+    if week_rows:
+        yield _week_arrays(current, week_rows)
+
+def _week_arrays(key, rows):
+    data = np.array([[np.nan if v is None else v for v in row[2:]] for row in rows], dtype=np.float64)
+    n = len(RANK_FEATURES)
+    home_rank, away_rank = data[:, 3:3 + n], data[:, 3 + n:]
+    features = np.where(np.isnan(home_rank) | np.isnan(away_rank), 0.0, (away_rank - home_rank) / 100)
+    return {
+        'season': key[0],
+        'week': key[1],
+        'home': data[:, 0].astype(np.int64),
+        'away': data[:, 1].astype(np.int64),
+        'margin': data[:, 2],
+        'features': features,
+    }
+
+def advance(state, season, week, priors=PRIORS):
+    # Predict step: teams regress toward 0 between seasons and drift a little between weeks
+    teams = slice(N_FIXED, None)
+    if season != state['season']:
+        if state['season']:
+            state['mean'][teams] *= priors['season_carryover']
+            state['var'][teams] = priors['season_carryover'] ** 2 * state['var'][teams] + priors['season_drift_sd'] ** 2
+    else:
+        state['var'][teams] += priors['week_drift_sd'] ** 2
+    state['season'], state['week'] = season, week
+
+def design_matrix(week_data, params):
+    # Rows are games, columns are the parameters this week touches
+    n = week_data['margin'].size
+    rows = np.arange(n)
+    H = np.zeros((n, params.size))
+    H[:, np.searchsorted(params, HOME)] = 1.0
+    H[:, np.searchsorted(params, np.arange(1, N_FIXED))] = week_data['features']
+    np.add.at(H, (rows, np.searchsorted(params, N_FIXED + week_data['home'])), 1.0)
+    np.add.at(H, (rows, np.searchsorted(params, N_FIXED + week_data['away'])), -1.0)
+    return H
+
+def predict(state, week_data, priors=PRIORS):
+    # Pre-game expected home margin and its standard deviation
+    params = np.unique(np.concatenate([
+        np.arange(N_FIXED), N_FIXED + week_data['home'], N_FIXED + week_data['away']]))
+    H = design_matrix(week_data, params)
+    mean = H @ state['mean'][params]
+    sd = np.sqrt((H ** 2) @ state['var'][params] + priors['margin_sd'] ** 2)
+    return mean, sd
+
+def update_week(state, week_data, priors=PRIORS):
+    # Closed-form Gaussian update for the whole week at once, then project back to independent marginals (ADF)
+    params = np.unique(np.concatenate([
+        np.arange(N_FIXED), N_FIXED + week_data['home'], N_FIXED + week_data['away']]))
+    H = design_matrix(week_data, params)
+    m, v = state['mean'][params], state['var'][params]
+
+    PHt = v[:, None] * H.T
+    S = H @ PHt + priors['margin_sd'] ** 2 * np.eye(H.shape[0])
+    K = np.linalg.solve(S, PHt.T).T
+
+    state['mean'][params] = m + K @ (week_data['margin'] - H @ m)
+    state['var'][params] = v - np.sum(K * PHt, axis=1)
+
+def checkpoint_path(checkpoint_dir, season, week):
+    return os.path.join(checkpoint_dir, f"posterior_{season}_{week:02d}.npz")
+
+def save_checkpoint(state, checkpoint_dir, priors=PRIORS):
+    np.savez(checkpoint_path(checkpoint_dir, state['season'], state['week']),
+             mean=state['mean'], var=state['var'], season=state['season'], week=state['week'],
+             prior_names=np.array(list(priors)), prior_values=np.array(list(priors.values())))
+
+def load_checkpoint(path):
+    with np.load(path) as data:
+        priors = dict(zip(data['prior_names'].tolist(), data['prior_values'].tolist())) if 'prior_names' in data else None
+        return {'mean': data['mean'].copy(), 'var': data['var'].copy(),
+                'season': int(data['season']), 'week': int(data['week']), 'priors': priors}
+
+def latest_checkpoint(checkpoint_dir, through=None):
+    # Newest checkpoint at or before `through` (season, week), or the newest overall
+    found = []
+    for path in glob.glob(os.path.join(checkpoint_dir, "posterior_*_*.npz")):
+        season, week = os.path.basename(path)[len("posterior_"):-len(".npz")].split("_")
+        key = (int(season), int(week))
+        if through is None or key <= tuple(through):
+            found.append((key, path))
+    return max(found)[1] if found else None
+
+def train(db_path, checkpoint_dir=CHECKPOINT_DIR, resume=True, through=None, priors=PRIORS, verbose=True,
+          metrics=None):
+    metrics = metrics or RunMetrics("bayesian-trainModel", verbose=verbose)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    conn = connect(db_path)
+    n_teams = conn.execute("SELECT COALESCE(MAX(team_id), 0) + 1 FROM teams").fetchone()[0]
+
+    path = latest_checkpoint(checkpoint_dir, through) if resume else None
+    state = load_checkpoint(path) if path else None
+    if state is not None and state.pop('priors') != {name: float(value) for name, value in priors.items()}:
+        # A posterior built under other priors would not match a from-scratch run with these
+        print(f"[WARNING] {os.path.basename(path)} was trained with different priors — training from the prior.")
+        state = path = None
+    state = state or initial_state(n_teams, priors)
+    if verbose:
+        print(f"[LOADING] Resuming from Season {state['season']}, Week {state['week']}" if path
+              else "[LOADING] Training from the prior")
+
+    start = time.perf_counter()
+    n_weeks = n_games = 0
+    season_errors = []
+    weeks = stream_weeks(conn, (state['season'], state['week']))
+    while True:
+        with metrics.stage("load"):
+            week_data = next(weeks, None)
+        if season_errors and (week_data is None or week_data['season'] != state['season']):
+            metrics.progress(f"Season {state['season']}: {len(season_errors)} games, "
+                             f"pre-game margin MAE {np.mean(season_errors):.2f}")
+            season_errors = []
+        if week_data is None:
+            break
+
+        with metrics.stage("update"):
+            ensure_capacity(state, int(max(week_data['home'].max(), week_data['away'].max())), priors)
+            advance(state, week_data['season'], week_data['week'], priors)
+
+            expected, _ = predict(state, week_data, priors)
+            season_errors.extend(np.abs(week_data['margin'] - expected).tolist())
+
+            update_week(state, week_data, priors)
+        with metrics.stage("checkpoint"):
+            save_checkpoint(state, checkpoint_dir, priors)
+        n_weeks += 1
+        n_games += week_data['margin'].size
+        metrics.season_counts(state['season'], games_processed=week_data['margin'].size, weeks_trained=1)
+
+    teams = pd.read_sql_query("SELECT team_id, team_name FROM teams", conn)
+    conn.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n[OK] Trained on {n_games} games over {n_weeks} weeks in {elapsed:.2f}s "
+          f"(through Season {state['season']}, Week {state['week']}).")
+    return state, teams
+
+def posterior_table(state, teams):
+    ids = teams['team_id'].to_numpy()
+    ids = ids[N_FIXED + ids < state['mean'].size]
+    table = pd.DataFrame({
+        'team_id': ids,
+        'strength': state['mean'][N_FIXED + ids],
+        'sd': np.sqrt(state['var'][N_FIXED + ids]),
+    }).merge(teams, on='team_id')
+    return table.sort_values('strength', ascending=False).reset_index(drop=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Online Bayesian team-strength model, trained one week at a time.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--checkpoints", default=CHECKPOINT_DIR)
+    parser.add_argument("--from-scratch", action="store_true", help="ignore existing checkpoints")
+    parser.add_argument("--resume-from", type=int, nargs=2, metavar=("SEASON", "WEEK"),
+                        help="resume from the newest checkpoint at or before this week")
+    add_arguments(parser)
+    args = parser.parse_args()
+    metrics = RunMetrics.from_argv("bayesian-trainModel")
+
+    state, teams = train(args.db, args.checkpoints, resume=not args.from_scratch, through=args.resume_from,
+                         metrics=metrics)
+
+    print(f"\nHome field: {state['mean'][HOME]:.2f} ± {np.sqrt(state['var'][HOME]):.2f}")
+    for i, name in enumerate(RANK_FEATURES, start=1):
+        print(f"{name} weight: {state['mean'][i]:.2f} ± {np.sqrt(state['var'][i]):.2f}")
+    print("\nTop 10 teams by posterior strength:")
+    print(posterior_table(state, teams).head(10)[['team_name', 'strength', 'sd']].round(2).to_string(index=False))
+    metrics.report()
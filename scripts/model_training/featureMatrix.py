@@ -0,0 +1,217 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_management"))
+from createDB import connect, source_stamps
+from runMetrics import RunMetrics, add_arguments
+
+DB_PATH = "../db_management/cfb_stats.db"
+MATRIX_VERSION = 1
+
+GAME_COLUMNS = ["game_id", "season", "week", "home_team_id", "away_team_id", "score_home", "score_away"]
+
+# Pre-game rolling means and their ranks: the game week's own rolling_team_stats row, built from earlier weeks
+STAT_SOURCES = [
+    "rolling_pass_yards_for", "rolling_rush_yards_for", "rolling_total_yards_for", "rolling_points_scored",
+    "rolling_pass_yards_against", "rolling_rush_yards_against", "rolling_total_yards_against", "rolling_points_allowed",
+    "pass_yards_for_rank", "rush_yards_for_rank", "total_yards_for_rank", "points_scored_rank",
+    "pass_yards_against_rank", "rush_yards_against_rank", "total_yards_against_rank", "points_allowed_rank",
+]
+# Ratings are post-week snapshots, so a game takes them from the team's latest earlier row that season
+RATING_SOURCES = ["rolling_elo", "elo_rank", "rolling_massey", "massey_rank", "rolling_colley", "colley_rank"]
+
+FEATURES = [source.replace("rolling_", "") for source in STAT_SOURCES + RATING_SOURCES]
+COLUMNS = GAME_COLUMNS + [f"{side}_{name}" for side in ("home", "away", "diff") for name in FEATURES]
+
+# Source rows behind each season's block, ordered; a season is re-queried only when the hash of its rows changes
+SEASON_ROWS = [
+    f"SELECT season, {', '.join(GAME_COLUMNS)} FROM games WHERE game_type = 'regular' ORDER BY season, game_id",
+    f"""SELECT season, team_id, week, {", ".join(STAT_SOURCES + RATING_SOURCES)}
+        FROM rolling_team_stats ORDER BY season, team_id, week""",
+]
+
+def _side_columns(alias, sources, side):
+    return ", ".join(f"{alias}.{source} AS {side}_{source.replace('rolling_', '')}" for source in sources)
+
+# Every game of the requested seasons with both teams' pre-game rows, in one join
+PREGAME_JOIN = f"""
+    WITH ratings AS (
+        SELECT team_id, season, week, {", ".join(RATING_SOURCES)},
+               LEAD(week) OVER (PARTITION BY team_id, season ORDER BY week) AS next_week
+        FROM rolling_team_stats
+        WHERE season IN (SELECT value FROM json_each(:seasons))
+    )
+    SELECT {", ".join(f"g.{c}" for c in GAME_COLUMNS)},
+           {_side_columns("hs", STAT_SOURCES, "home")}, {_side_columns("hr", RATING_SOURCES, "home")},
+           {_side_columns("aws", STAT_SOURCES, "away")}, {_side_columns("ar", RATING_SOURCES, "away")}
+    FROM games g
+    LEFT JOIN rolling_team_stats hs ON hs.team_id = g.home_team_id AND hs.season = g.season AND hs.week = g.week
+    LEFT JOIN rolling_team_stats aws ON aws.team_id = g.away_team_id AND aws.season = g.season AND aws.week = g.week
+    LEFT JOIN ratings hr ON hr.team_id = g.home_team_id AND hr.season = g.season
+                        AND hr.week < g.week AND (hr.next_week IS NULL OR hr.next_week >= g.week)
+    LEFT JOIN ratings ar ON ar.team_id = g.away_team_id AND ar.season = g.season
+                        AND ar.week < g.week AND (ar.next_week IS NULL OR ar.next_week >= g.week)
+    WHERE g.game_type = 'regular' AND g.season IN (SELECT value FROM json_each(:seasons))
+    ORDER BY g.season, g.week, g.game_id
+"""
+
+# Tables behind SEASON_ROWS; while their change stamps match the manifest's, no season needs re-hashing
+STAMP_TABLES = ["games", "rolling_team_stats"]
+
+def matrix_path(db_path):
+    return os.path.splitext(db_path)[0] + ".features"
+
+def _write_manifest(path, manifest):
+    with open(os.path.join(path, ".manifest.json.tmp"), "w") as f:
+        json.dump(manifest, f)
+    os.replace(os.path.join(path, ".manifest.json.tmp"), os.path.join(path, "manifest.json"))
+
+def season_signatures(conn):
+    # {season: sha256 of every source row of that season}
+    hashes = {}
+    for part, query in enumerate(SEASON_ROWS):
+        for row in conn.execute(query):
+            digest = hashes.setdefault(str(row[0]), hashlib.sha256(f"v{MATRIX_VERSION}".encode()))
+            digest.update(f"{part}{row[1:]!r}".encode())
+    return {season: digest.hexdigest() for season, digest in hashes.items()}
+
+def pregame_rows(conn, seasons):
+    # games × COLUMNS float32 block for the given seasons: the SQL join, then home-minus-away in one subtraction
+    frame = pd.read_sql_query(PREGAME_JOIN, conn, params={'seasons': json.dumps([int(s) for s in seasons])})
+    home = frame[[f"home_{name}" for name in FEATURES]].to_numpy(np.float64)
+    away = frame[[f"away_{name}" for name in FEATURES]].to_numpy(np.float64)
+    return np.hstack([frame[GAME_COLUMNS].to_numpy(np.float64), home, away, home - away]).astype(np.float32)
+
+def build_matrix(db_path=DB_PATH, path=None, rebuild=False, verbose=True, metrics=None):
+    # Rewrite the matrix with unchanged seasons copied from the previous one and only stale seasons re-queried
+    metrics = metrics or RunMetrics("featureMatrix", verbose=verbose)
+    path = path or matrix_path(db_path)
+    os.makedirs(path, exist_ok=True)
+    old = None if rebuild else open_matrix(path)
+
+    conn = connect(db_path)
+    with metrics.stage("signatures"):
+        stamps = source_stamps(conn, STAMP_TABLES)  # read first, so a write during the build clears them again
+        signatures = season_signatures(conn)
+    seasons = sorted(signatures, key=int)
+    stale = [s for s in seasons if old is None or old.manifest['seasons'].get(s, {}).get('signature') != signatures[s]]
+    with metrics.stage("query"):
+        fresh = pregame_rows(conn, stale) if stale else np.empty((0, len(COLUMNS)), np.float32)
+    conn.close()
+
+    # Rows of each season: copied from the old matrix, or sliced out of the fresh block (both season-ordered)
+    fresh_seasons = fresh[:, COLUMNS.index("season")].astype(np.int64)
+    blocks = {}
+    for season in seasons:
+        if season in stale:
+            lo, hi = np.searchsorted(fresh_seasons, [int(season), int(season) + 1])
+            blocks[season] = fresh[lo:hi]
+        else:
+            rows = old.manifest['seasons'][season]
+            blocks[season] = old.matrix[rows['start']:rows['stop']]
+
+    n_rows = sum(len(block) for block in blocks.values())
+    tmp_file = os.path.join(path, ".matrix.npy.tmp")
+    matrix = np.lib.format.open_memmap(tmp_file, mode="w+", dtype=np.float32, shape=(n_rows, len(COLUMNS)))
+    manifest = {'version': MATRIX_VERSION, 'columns': COLUMNS, 'stamps': stamps, 'seasons': {}}
+    start = 0
+    with metrics.stage("write"):
+        for season in seasons:
+            stop = start + len(blocks[season])
+            matrix[start:stop] = blocks[season]
+            manifest['seasons'][season] = {'signature': signatures[season], 'start': start, 'stop': stop}
+            metrics.season_counts(season, **{'rows_rebuilt' if season in stale else 'rows_reused': stop - start})
+            metrics.season_progress(season)
+            start = stop
+        matrix.flush()
+    del matrix, blocks, old
+
+    os.replace(tmp_file, os.path.join(path, "matrix.npy"))
+    _write_manifest(path, manifest)
+    if verbose:
+        print(f"[OK] Feature matrix: {n_rows} games × {len(COLUMNS)} columns, "
+              f"{len(seasons) - len(stale)} seasons reused, {len(stale)} rebuilt.")
+    return FeatureMatrix(path)
+
+def open_matrix(path):
+    # The matrix at path if it exists and matches this version's columns, else None
+    try:
+        matrix = FeatureMatrix(path)
+    except (FileNotFoundError, ValueError):
+        return None
+    return matrix if matrix.manifest.get('version') == MATRIX_VERSION and matrix.manifest['columns'] == COLUMNS else None
+
+def load_matrix(db_path=DB_PATH, path=None, rebuild=False, verbose=False, metrics=None):
+    # The feature matrix for db_path, refreshed first for any season whose source rows changed. Unchanged source
+    # tables are spotted from their change stamps alone; seasons are only re-hashed after a write to one of them
+    path = path or matrix_path(db_path)
+    matrix = None if rebuild else open_matrix(path)
+    if matrix is not None:
+        conn = connect(db_path)
+        stamps = source_stamps(conn, STAMP_TABLES)
+        if matrix.manifest.get('stamps') == stamps:
+            conn.close()
+            return matrix
+        signatures = season_signatures(conn)
+        conn.close()
+        if {s: v['signature'] for s, v in matrix.manifest['seasons'].items()} == signatures:
+            # Written to but unchanged (e.g. a rerun that rewrote the same rows): keep the rows, note the stamps
+            _write_manifest(path, {**matrix.manifest, 'stamps': stamps})
+            matrix.manifest['stamps'] = stamps
+            return matrix
+    return build_matrix(db_path, path, rebuild, verbose, metrics)
+
+class FeatureMatrix:
+    # games × COLUMNS float32, memory-mapped read-only; rows ordered by season, week, game_id
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.matrix = np.load(os.path.join(path, "matrix.npy"), mmap_mode="r")
+        self.columns = self.manifest['columns']
+        self._index = {name: i for i, name in enumerate(self.columns)}
+
+    def __getitem__(self, name):
+        return self.matrix[:, self._index[name]]
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def rows(self, seasons=None):
+        # Row slice covering a season range (first, last), or everything
+        if seasons is None:
+            return slice(0, len(self.matrix))
+        first, last = seasons
+        spans = [v for s, v in self.manifest['seasons'].items() if first <= int(s) <= last]
+        return slice(min((v['start'] for v in spans), default=0), max((v['stop'] for v in spans), default=0))
+
+    def frame(self, columns=None, seasons=None):
+        # DataFrame copy of some columns; id/week columns come back as int64
+        columns = columns or self.columns
+        block = self.matrix[self.rows(seasons)][:, [self._index[c] for c in columns]]
+        frame = pd.DataFrame(block, columns=columns)
+        for col in ("game_id", "season", "week", "home_team_id", "away_team_id"):
+            if col in frame:
+                frame[col] = frame[col].astype(np.int64)
+        return frame
+
+# Run it (--rebuild forces every season to be re-queried)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-game games × features matrix for model training.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--rebuild", action="store_true")
+    add_arguments(parser)
+    args = parser.parse_args()
+    metrics = RunMetrics.from_argv("featureMatrix")
+
+    start = time.perf_counter()
+    matrix = load_matrix(args.db, rebuild=args.rebuild, verbose=True, metrics=metrics)
+    print(f"[OK] {matrix.path}: {len(matrix)} rows, {matrix.matrix.nbytes / 2 ** 20:.1f} MB "
+          f"({time.perf_counter() - start:.2f}s).")
+    metrics.report()
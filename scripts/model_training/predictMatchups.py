@@ -0,0 +1,172 @@
+import os
+import sys
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_management"))
+from createDB import connect
+
+DB_PATH = "../db_management/cfb_stats.db"
+
+ELO_PER_POINT = 25.0  # Elo difference worth one point of margin
+STAT_WEIGHT = 0.5     # share of the expected margin taken from rolling scoring stats rather than Elo
+CACHE_SIZE = 64
+
+@lru_cache(maxsize=CACHE_SIZE)
+def team_state(season, week, db_path=DB_PATH):
+    # Every team's pre-game state for (season, week): Elo after its last game earlier that season,
+    # plus its latest rolling scoring stats and ranks. Cached; arrays are read-only.
+    conn = connect(db_path)
+    state = pd.read_sql_query("""
+        WITH elo AS (
+            SELECT team_id, rolling_elo,
+                   ROW_NUMBER() OVER (PARTITION BY team_id ORDER BY week DESC) AS rn
+            FROM rolling_team_stats
+            WHERE season = ? AND week < ? AND rolling_elo IS NOT NULL
+        ), stats AS (
+            SELECT team_id, rolling_points_scored, rolling_points_allowed,
+                   points_scored_rank, points_allowed_rank,
+                   ROW_NUMBER() OVER (PARTITION BY team_id ORDER BY season DESC, week DESC) AS rn
+            FROM rolling_team_stats
+            WHERE season BETWEEN ? AND ? AND (season, week) <= (?, ?)
+        )
+        SELECT t.team_id, t.team_name,
+               COALESCE(e.rolling_elo, 1500.0) AS elo,
+               s.rolling_points_scored, s.rolling_points_allowed,
+               s.points_scored_rank, s.points_allowed_rank
+        FROM teams t
+        LEFT JOIN elo e ON e.team_id = t.team_id AND e.rn = 1
+        LEFT JOIN stats s ON s.team_id = t.team_id AND s.rn = 1
+        ORDER BY t.team_id
+    """, conn, params=(season, week, season - 1, season, season, week))
+    conn.close()
+
+    arrays = {col: state[col].to_numpy() for col in state.columns}
+    for values in arrays.values():
+        values.flags.writeable = False
+    return arrays
+
+@lru_cache(maxsize=1)
+def team_index(db_path=DB_PATH):
+    # team_name -> team_id, loaded once
+    conn = connect(db_path)
+    index = dict(conn.execute("SELECT team_name, team_id FROM teams").fetchall())
+    conn.close()
+    return index
+
+def clear_cache():
+    team_state.cache_clear()
+    team_index.cache_clear()
+    week_teams.cache_clear()
+
+def _unknown(teams, index):
+    known_ids = set(index.values())
+    return [team for team in teams
+            if (team not in known_ids if isinstance(team, (int, np.integer)) else team not in index)]
+
+def _resolve(teams, db_path):
+    # team_ids for names or ids; teams added since the index was cached are picked up by one reload, and anything
+    # still unknown raises ValueError rather than a KeyError or a lookup into another team's slot
+    teams = list(teams)
+    index = team_index(db_path)
+    if _unknown(teams, index):
+        team_index.cache_clear()
+        index = team_index(db_path)
+        unknown = _unknown(teams, index)
+        if unknown:
+            raise ValueError(f"Unknown team(s): {', '.join(map(str, dict.fromkeys(unknown)))}")
+    return np.array([team if isinstance(team, (int, np.integer)) else index[team] for team in teams], dtype=np.int64)
+
+def _positions(state, team_ids):
+    # Rows of team_ids in a team_state; a team missing from a cached state (added since) is an error, not a neighbour
+    pos = np.minimum(np.searchsorted(state['team_id'], team_ids), max(state['team_id'].size - 1, 0))
+    if state['team_id'].size == 0 or np.any(state['team_id'][pos] != team_ids):
+        missing = np.setdiff1d(team_ids, state['team_id'])
+        raise ValueError(f"No state for team_id(s) {', '.join(map(str, missing))} (added since it was cached? "
+                         "call clear_cache())")
+    return pos
+
+def _predict(state, home_pos, away_pos, stat_weight):
+    # Broadcasts over any matching shapes of home/away positions into the state arrays
+    elo_home, elo_away = state['elo'][home_pos], state['elo'][away_pos]
+    home_win_prob = 1 / (1 + 10 ** ((elo_away - elo_home) / 400))
+    elo_margin = (elo_home - elo_away) / ELO_PER_POINT
+
+    # Each side's expected points: its scoring average against the opponent's points-allowed average
+    home_points = (state['rolling_points_scored'][home_pos] + state['rolling_points_allowed'][away_pos]) / 2
+    away_points = (state['rolling_points_scored'][away_pos] + state['rolling_points_allowed'][home_pos]) / 2
+    stat_margin = home_points - away_points
+
+    expected_margin = np.where(np.isnan(stat_margin), elo_margin,
+                               (1 - stat_weight) * elo_margin + stat_weight * stat_margin)
+    return home_win_prob, elo_margin, stat_margin, expected_margin
+
+def predict_matchups(matchups, db_path=DB_PATH, stat_weight=STAT_WEIGHT):
+    # matchups: iterable of (home, away, season, week); teams by name or team_id
+    requests = pd.DataFrame(list(matchups), columns=['home', 'away', 'season', 'week'])
+    requests['home_team_id'] = _resolve(requests['home'], db_path)
+    requests['away_team_id'] = _resolve(requests['away'], db_path)
+
+    results = []
+    for (season, week), group in requests.groupby(['season', 'week'], sort=False):
+        state = team_state(int(season), int(week), db_path)
+        home_pos = _positions(state, group['home_team_id'].to_numpy())
+        away_pos = _positions(state, group['away_team_id'].to_numpy())
+        prob, elo_margin, stat_margin, margin = _predict(state, home_pos, away_pos, stat_weight)
+        results.append(pd.DataFrame({
+            'season': season,
+            'week': week,
+            'home_team': state['team_name'][home_pos],
+            'away_team': state['team_name'][away_pos],
+            'home_elo': state['elo'][home_pos],
+            'away_elo': state['elo'][away_pos],
+            'home_win_prob': prob,
+            'elo_margin': elo_margin,
+            'stat_margin': stat_margin,
+            'expected_margin': margin,
+        }, index=group.index))
+
+    columns = ['season', 'week', 'home_team', 'away_team', 'home_elo', 'away_elo',
+               'home_win_prob', 'elo_margin', 'stat_margin', 'expected_margin']
+    return pd.concat(results).sort_index() if results else pd.DataFrame(columns=columns)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def week_teams(season, week, db_path=DB_PATH):
+    # team_ids scheduled in regular-season games that week (cached, read-only)
+    conn = connect(db_path)
+    ids = [row[0] for row in conn.execute("""
+        SELECT home_team_id FROM games WHERE game_type = 'regular' AND season = ? AND week = ?
+        UNION
+        SELECT away_team_id FROM games WHERE game_type = 'regular' AND season = ? AND week = ?
+    """, (season, week, season, week))]
+    conn.close()
+    ids = np.array(sorted(ids), dtype=np.int64)
+    ids.flags.writeable = False
+    return ids
+
+def pair_matrix(season, week, teams=None, db_path=DB_PATH, stat_weight=STAT_WEIGHT):
+    # N×N matrices for every home (row) vs away (column) pairing, in one vectorized pass
+    team_ids = week_teams(int(season), int(week), db_path) if teams is None else _resolve(teams, db_path)
+    state = team_state(int(season), int(week), db_path)
+    pos = _positions(state, team_ids)
+    prob, _, _, margin = _predict(state, pos[:, None], pos[None, :], stat_weight)
+    return state['team_name'][pos], prob, margin
+
+def predict_all_pairs(season, week, teams=None, db_path=DB_PATH, stat_weight=STAT_WEIGHT):
+    names, prob, margin = pair_matrix(season, week, teams, db_path, stat_weight)
+    home, away = np.nonzero(~np.eye(names.size, dtype=bool))
+    return pd.DataFrame({
+        'season': season,
+        'week': week,
+        'home_team': names[home],
+        'away_team': names[away],
+        'home_win_prob': prob[home, away],
+        'expected_margin': margin[home, away],
+    })
+
+# Example use
+if __name__ == "__main__":
+    print(predict_matchups([("Oregon", "Washington", 2024, 10), ("Georgia", "Alabama", 2024, 10)]).round(3).to_string(index=False))
+    pairs = predict_all_pairs(2024, 10)
+    print(pairs.sort_values('home_win_prob', ascending=False).head(10).round(3).to_string(index=False))
@@ -0,0 +1,193 @@
+import argparse
+import os
+import sys
+import time
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_management"))
+from createDB import connect
+from predictMatchups import DB_PATH, team_state
+from runMetrics import RunMetrics, add_arguments
+
+SIMULATIONS = 100_000
+CHUNK_SIZE = 10_000
+
+# fillElo's K-factor, as its main runs it: base_k * decay ** (week - 1) * (1 + rank difference / divisor)
+BASE_K = 25
+DECAY_FACTOR = 0.97
+RANK_DIVISOR = 25
+
+def schedule_rounds(home, away):
+    # Round of every game such that no team plays twice in a round, keeping each team's game order
+    last_round = {}
+    round_of = np.empty(home.size, dtype=np.int64)
+    for i, (h, a) in enumerate(zip(home.tolist(), away.tolist())):
+        round_of[i] = max(last_round.get(h, -1), last_round.get(a, -1)) + 1
+        last_round[h] = last_round[a] = round_of[i]
+    return round_of
+
+def load_snapshot(season, week, db_path=DB_PATH, base_k=BASE_K, decay_factor=DECAY_FACTOR, rank_divisor=RANK_DIVISOR):
+    # Everything a simulation needs after `week` of `season` has been played (week 0 = preseason):
+    # each team's Elo, ranks and wins so far, and the remaining regular-season games as team positions
+    conn = connect(db_path)
+    games = pd.read_sql_query("""
+        SELECT week, home_team_id, away_team_id, score_home, score_away FROM games
+        WHERE game_type = 'regular' AND season = ?
+        ORDER BY week, game_id
+    """, conn, params=(season,))
+    conn.close()
+    if games.empty:
+        raise ValueError(f"No regular-season games for {season}")
+
+    team_ids = np.union1d(games['home_team_id'], games['away_team_id'])
+    home = np.searchsorted(team_ids, games['home_team_id'].to_numpy())
+    away = np.searchsorted(team_ids, games['away_team_id'].to_numpy())
+
+    # Elo after each team's last game through `week` (1500 if none yet), frozen ranks for the K modifier
+    state = team_state(int(season), int(week) + 1, db_path)
+    pos = np.searchsorted(state['team_id'], team_ids)
+
+    played = (games['week'] <= week).to_numpy() & games['score_home'].notna().to_numpy() & games['score_away'].notna().to_numpy()
+    home_won = played & (games['score_home'] > games['score_away']).to_numpy()
+    away_won = played & (games['score_away'] > games['score_home']).to_numpy()
+    wins = np.bincount(home[home_won], minlength=team_ids.size) + np.bincount(away[away_won], minlength=team_ids.size)
+
+    # Remaining games sorted by round, so each round is a contiguous block of rows in the simulation
+    remaining = np.flatnonzero((games['week'] > week).to_numpy())
+    round_of = schedule_rounds(home[remaining], away[remaining])
+    remaining = remaining[np.argsort(round_of, kind='stable')]
+    bounds = np.r_[0, np.cumsum(np.bincount(round_of))] if remaining.size else np.zeros(1, dtype=np.int64)
+    home, away = home[remaining], away[remaining]
+    off_rank = state['points_scored_rank'][pos].astype(np.float64)
+    def_rank = state['points_allowed_rank'][pos].astype(np.float64)
+    rank_diff_mod = np.nan_to_num((def_rank[away] - off_rank[home]) / rank_divisor, nan=0.0)
+    weeks = games['week'].to_numpy()[remaining]
+
+    return {
+        'season': int(season),
+        'week': int(week),
+        'team_ids': team_ids,
+        'team_names': state['team_name'][pos],
+        'elo': state['elo'][pos].astype(np.float64),
+        'wins': wins,
+        'home': home,
+        'away': away,
+        'k': base_k * decay_factor ** (weeks - 1) * (1 + rank_diff_mod),
+        'rounds': list(zip(bounds[:-1].tolist(), bounds[1:].tolist())),
+    }
+
+def simulate_chunk(task):
+    # n simulated finishes from one random matrix (sims × remaining games); returns win-total and rank counts
+    snapshot, n, seed, update_elo = task
+    rng = np.random.default_rng(seed)
+    home, away, k = snapshot['home'], snapshot['away'], snapshot['k']
+    n_teams = snapshot['elo'].size
+    draws = rng.random((home.size, n), dtype=np.float32)  # row per remaining game, column per path
+
+    if update_elo:
+        # Every path carries its own Elo (team × path), updated round by round with fillElo's expectation and K
+        elo = np.repeat(snapshot['elo'][:, None], n, axis=1)
+        home_win = np.empty((home.size, n), dtype=bool)
+        for lo, hi in snapshot['rounds']:
+            h, a = home[lo:hi], away[lo:hi]
+            expected = 1 / (1 + 10 ** ((elo[a] - elo[h]) / 400))
+            home_win[lo:hi] = draws[lo:hi] < expected
+            change = k[lo:hi, None] * (home_win[lo:hi] - expected)
+            elo[h] += change
+            elo[a] -= change
+    else:
+        elo = np.broadcast_to(snapshot['elo'][:, None], (n_teams, n))
+        expected = 1 / (1 + 10 ** ((snapshot['elo'][away] - snapshot['elo'][home]) / 400))
+        home_win = draws < expected[:, None]
+
+    # Wins per team per path as one matrix product with the team × game incidence
+    incidence_home = np.zeros((n_teams, home.size), dtype=np.float32)
+    incidence_away = np.zeros((n_teams, home.size), dtype=np.float32)
+    incidence_home[home, np.arange(home.size)] = 1
+    incidence_away[away, np.arange(home.size)] = 1
+    won = home_win.astype(np.float32)
+    wins = snapshot['wins'] + np.rint(incidence_home @ won + incidence_away @ (1 - won)).astype(np.int64).T
+
+    # Final rank within each path: most wins first, final Elo breaks ties
+    order = np.argsort(-(wins * 10_000.0 + elo.T), axis=1, kind='stable')
+    rank = np.empty((n, n_teams), dtype=np.int64)
+    np.put_along_axis(rank, order, np.arange(n_teams), axis=1)
+
+    games_left = np.bincount(home, minlength=n_teams) + np.bincount(away, minlength=n_teams)
+    max_wins = int((snapshot['wins'] + games_left).max()) + 1
+    teams = np.arange(n_teams)
+    win_counts = np.bincount((teams * max_wins + wins).ravel(), minlength=n_teams * max_wins).reshape(n_teams, max_wins)
+    rank_counts = np.bincount((teams * n_teams + rank).ravel(), minlength=n_teams * n_teams).reshape(n_teams, n_teams)
+    return win_counts, rank_counts
+
+def simulate_season(snapshot, sims=SIMULATIONS, update_elo=False, seed=0, workers=1, chunk_size=CHUNK_SIZE):
+    # Chunks get independent child seeds, so results depend on `seed` but not on `workers`
+    sizes = [min(chunk_size, sims - start) for start in range(0, sims, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(snapshot, n, child, update_elo) for n, child in zip(sizes, seeds)]
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    if workers == 1:
+        results = [simulate_chunk(task) for task in tasks]
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(simulate_chunk, tasks)
+    win_counts = sum(r[0] for r in results)
+    rank_counts = sum(r[1] for r in results)
+    return win_counts, rank_counts
+
+def summarize(snapshot, win_counts, rank_counts, top=(1, 4, 10)):
+    # Per-team expected wins, win-total quantiles, expected final rank and chances of finishing in the top N
+    sims = win_counts[0].sum()
+    win_values = np.arange(win_counts.shape[1])
+    rank_values = np.arange(1, rank_counts.shape[1] + 1)
+    win_cdf = np.cumsum(win_counts, axis=1) / sims
+    rank_cdf = np.cumsum(rank_counts, axis=1) / sims
+
+    frame = pd.DataFrame({
+        'team': snapshot['team_names'],
+        'elo': snapshot['elo'].round(1),
+        'wins_so_far': snapshot['wins'],
+        'exp_wins': win_counts @ win_values / sims,
+        'wins_p10': (win_cdf < 0.1).sum(axis=1),
+        'wins_p90': (win_cdf < 0.9).sum(axis=1),
+        'exp_rank': rank_counts @ rank_values / sims,
+    })
+    for n in top:
+        frame[f"p_top{n}"] = rank_cdf[:, min(n, rank_cdf.shape[1]) - 1]
+    return frame.sort_values('exp_rank', kind='stable').reset_index(drop=True)
+
+# Run it
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo finishes for the rest of a season from current Elo.")
+    parser.add_argument("season", type=int)
+    parser.add_argument("week", type=int, help="last week already played (0 = preseason)")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--sims", type=int, default=SIMULATIONS)
+    parser.add_argument("--update-elo", action="store_true", help="update Elo within each simulated path")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="processes to split chunks across (0 = all cores)")
+    parser.add_argument("-n", type=int, default=25, help="teams to print")
+    parser.add_argument("--csv", default=None, help="write every team's summary here")
+    add_arguments(parser)
+    args = parser.parse_args()
+    metrics = RunMetrics.from_argv("simulateSeason")
+
+    start = time.perf_counter()
+    with metrics.stage("load"):
+        snapshot = load_snapshot(args.season, args.week, args.db)
+    print(f"[LOADING] Simulating {args.sims:,} finishes of Season {args.season} after Week {args.week} "
+          f"({snapshot['home'].size} games left, {snapshot['elo'].size} teams)")
+    with metrics.stage("simulate"):
+        win_counts, rank_counts = simulate_season(snapshot, args.sims, args.update_elo, args.seed, args.workers)
+    with metrics.stage("summarize"):
+        summary = summarize(snapshot, win_counts, rank_counts)
+    metrics.count("simulations", args.sims)
+    metrics.count("games_simulated", args.sims * snapshot['home'].size)
+    print(summary.head(args.n).round(3).to_string(index=False))
+    if args.csv:
+        summary.to_csv(args.csv, index=False)
+    print(f"\n[OK] {args.sims:,} simulations in {time.perf_counter() - start:.2f}s.")
+    metrics.report()
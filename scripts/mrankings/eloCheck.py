@@ -1,24 +1,21 @@
-import sqlite3
-import pandas as pd
+import os
+import sys
 
-def print_top10_elo_weekly(db_path):
-    conn = sqlite3.connect(db_path)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_management"))
+from createDB import connect
+from leaderboard import weekly_leaders
 
-    # Load rolling stats + team names
-    elo = pd.read_sql_query("SELECT * FROM rolling_team_stats", conn)
-    teams = pd.read_sql_query("SELECT * FROM teams", conn)
+def print_top10_elo_weekly(db_path, n=10, first_season=None, last_season=None, team=None):
+    conn = connect(db_path)
 
-    # Merge in team names
-    elo = elo.merge(teams, on="team_id", how="left")
-
-    # Loop over each season and week
-    for (season, week), group in elo.groupby(["season", "week"]):
-        top10 = group.sort_values(by="rolling_elo", ascending=False).head(10)
-
-        print(f"\n[Loading] Season {season} – Week {week} Top 10 Elo Ratings")
-        print(top10[["team_name", "rolling_elo"]].round(1).reset_index(drop=True).to_string(index=False))
+    # Top 10 per week comes back from SQLite already ranked, one season at a time
+    for season, leaders in weekly_leaders(conn, n, first_season, last_season, team, include_unrated=True):
+        for week, top10 in leaders.groupby("week"):
+            print(f"\n[Loading] Season {season} – Week {week} Top 10 Elo Ratings")
+            print(top10[["team_name", "rolling_elo"]].round(1).reset_index(drop=True).to_string(index=False))
 
     conn.close()
 
 # Run it
-print_top10_elo_weekly("../db_management/cfb_stats.db")
+if __name__ == "__main__":
+    print_top10_elo_weekly("../db_management/cfb_stats.db")
@@ -0,0 +1,135 @@
+import argparse
+import itertools
+import os
+import sys
+import time
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_management"))
+from createDB import connect
+from seasonStore import load_store
+from fillElo import build_game_arrays, conflict_free_batches, play_week_arrays
+from runMetrics import RunMetrics, add_arguments
+
+DB_PATH = "../db_management/cfb_stats.db"
+
+# Filled once per worker process; every configuration reads the same arrays
+_shared = {}
+
+def load_schedule(db_path):
+    # Game arrays plus each (season, week)'s game indices and conflict-free batches, built once
+    games = load_store(db_path).games_frame()
+    conn = connect(db_path)
+    ranks = pd.read_sql_query(
+        "SELECT season, week, team_id, points_scored_rank, points_allowed_rank FROM rolling_team_stats", conn)
+    conn.close()
+
+    game_arrays = build_game_arrays(games, ranks)
+    n_slots = int(max(game_arrays['home'].max(initial=0), game_arrays['away'].max(initial=0))) + 1
+
+    weeks = []
+    keys = np.column_stack([game_arrays['season'], game_arrays['week']])
+    starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)])
+    for start, stop in zip(starts, np.r_[starts[1:], len(keys)]):
+        idx = np.arange(start, stop)
+        batches = conflict_free_batches(game_arrays['home'][idx], game_arrays['away'][idx])
+        weeks.append((int(keys[start, 0]), int(keys[start, 1]), idx, batches))
+    return game_arrays, weeks, n_slots
+
+def _init_worker(game_arrays, weeks, n_slots):
+    _shared.update(game_arrays=game_arrays, weeks=weeks, n_slots=n_slots)
+
+def score_config(config):
+    # Replay every season with one parameter set; score the pre-game expectations of games from eval_from on
+    base_k, decay_factor, rank_divisor, eval_from = config
+    game_arrays, weeks = _shared['game_arrays'], _shared['weeks']
+
+    current_elo = np.full(_shared['n_slots'], 1500.0)
+    expected = np.empty(len(game_arrays['season']))
+    season = None
+    for week_season, week, idx, batches in weeks:
+        if week_season != season:
+            current_elo[:] = 1500.0
+            season = week_season
+        _, _, expected[idx] = play_week_arrays(
+            current_elo, game_arrays, idx, week, base_k, decay_factor, rank_divisor, batches)
+
+    scored = game_arrays['season'] >= eval_from
+    p = np.clip(expected[scored], 1e-15, 1 - 1e-15)
+    y = game_arrays['home_win'][scored]
+    return {
+        'base_k': base_k,
+        'decay_factor': decay_factor,
+        'rank_divisor': rank_divisor,
+        'games': int(scored.sum()),
+        'log_loss': float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p))),
+        'brier': float(np.mean((p - y) ** 2)),
+        'accuracy': float(np.mean((p > 0.5) == (y == 1))),
+    }
+
+def grid_configs(base_ks, decay_factors, rank_divisors):
+    return list(itertools.product(base_ks, decay_factors, rank_divisors))
+
+def random_configs(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return list(zip(
+        rng.uniform(5, 60, n).round(2).tolist(),
+        rng.uniform(0.85, 1.0, n).round(4).tolist(),
+        rng.uniform(10, 100, n).round(1).tolist(),
+    ))
+
+def run_sweep(db_path, configs, eval_from=None, workers=None, metrics=None):
+    metrics = metrics or RunMetrics("eloSweep")
+    with metrics.stage("load"):
+        game_arrays, weeks, n_slots = load_schedule(db_path)
+    if eval_from is None:
+        # Hold out everything after the first season
+        eval_from = int(game_arrays['season'].min(initial=0)) + 1
+
+    tasks = [(*config, eval_from) for config in configs]
+    workers = workers or os.cpu_count() or 1
+    with metrics.stage("score"):
+        if workers == 1:
+            _init_worker(game_arrays, weeks, n_slots)
+            results = [score_config(task) for task in tasks]
+        else:
+            with Pool(workers, initializer=_init_worker, initargs=(game_arrays, weeks, n_slots)) as pool:
+                results = pool.map(score_config, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+    metrics.count("configs_scored", len(results))
+    metrics.count("games_scored", sum(r['games'] for r in results))
+
+    table = pd.DataFrame(results).sort_values(['log_loss', 'brier']).reset_index(drop=True)
+    table.index += 1
+    return table
+
+def _floats(text):
+    return [float(v) for v in text.split(",")]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score Elo parameter sets on pre-game log-loss and Brier score.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--base-k", type=_floats, default=[15, 20, 25, 30, 35])
+    parser.add_argument("--decay-factor", type=_floats, default=[0.9, 0.93, 0.95, 0.97, 1.0])
+    parser.add_argument("--rank-divisor", type=_floats, default=[15, 25, 50])
+    parser.add_argument("--random", type=int, default=0, help="sample this many random configurations instead of the grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--eval-from", type=int, default=None, help="first season scored (default: second season in the data)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", default=None, help="also write the full ranked table to this CSV")
+    add_arguments(parser)
+    args = parser.parse_args()
+    metrics = RunMetrics.from_argv("eloSweep")
+
+    configs = random_configs(args.random, args.seed) if args.random else \
+        grid_configs(args.base_k, args.decay_factor, args.rank_divisor)
+
+    start = time.perf_counter()
+    table = run_sweep(args.db, configs, args.eval_from, args.workers, metrics)
+    print(f"[OK] Scored {len(configs)} configurations in {time.perf_counter() - start:.1f}s")
+    print(table.head(args.top).round(4).to_string())
+    if args.out:
+        table.to_csv(args.out, index_label="rank")
+    metrics.report()
@@ -1,58 +1,136 @@
-import sqlite3
-import pandas as pd
+import argparse
+import contextlib
+import json
+import os
+import sys
+from multiprocessing import Pool
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 
-def print_weekly_top10_and_plot_by_season(db_path):
-    conn = sqlite3.connect(db_path)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_management"))
+from createDB import connect
+from runMetrics import RunMetrics, add_arguments
+from leaderboard import weekly_leaders, week_leaders, team_history
 
-    # Load data
-    elo = pd.read_sql_query("""
-        SELECT team_id, season, week, rolling_elo
-        FROM rolling_team_stats
-        WHERE rolling_elo IS NOT NULL
-    """, conn)
+PLOT_DIR = "../../plots/elo"
 
-    teams = pd.read_sql_query("SELECT * FROM teams", conn)
-    conn.close()
+def final_week(season, weeks):
+    # Week whose top 10 gets plotted: skip the bowl week, except in 2020
+    if season < 2009 or season != 2020:
+        return max(weeks) - 1
+    return max(weeks)
+
+def season_series(history, teams):
+    # team name -> (weeks, elos), in final top-10 order
+    by_team = {team_id: rows for team_id, rows in history.groupby('team_id')}
+    series = []
+    for team_id, team in teams:
+        rows = by_team.get(team_id, history.iloc[:0])
+        series.append((team, rows['week'].tolist(), rows['rolling_elo'].tolist()))
+    return series
+
+def plot_season(ax, season, series):
+    for team, weeks, elos in series:
+        ax.plot(weeks, elos, label=team)
+
+    ax.set_title(f"Elo Ratings Over Time – Top 10 Teams (Season {season})")
+    ax.set_xlabel("Week")
+    ax.set_ylabel("Elo Rating")
+    ax.grid(True)
+    ax.legend(loc="best", fontsize="x-small")
+
+def print_weekly_top10_and_plot_by_season(db_path, n=10, first_season=None, last_season=None):
+    conn = connect(db_path)
 
-    # Merge team names
-    elo = elo.merge(teams, on='team_id', how='left')
-
-    # Compute Elo deltas
-    elo['elo_delta'] = elo.sort_values(['team_id', 'season', 'week']) \
-                          .groupby(['team_id', 'season'])['rolling_elo'] \
-                          .diff().fillna(0)
-
-    # Print weekly top 10 for each season
-    for (season, week), group in elo.groupby(['season', 'week']):
-        top10 = group.sort_values(by='rolling_elo', ascending=False).head(10)
-        print(f"\n Season {season} – Week {week} Top 10 Elo")
-        print(top10[['team_name', 'rolling_elo', 'elo_delta']].round(1).to_string(index=False))
-
-    # Plot top 10 Elo per season separately
-    for season in sorted(elo['season'].unique()):
-        season_weeks = elo[elo['season'] == season]['week'].unique()
-        if season < 2009 or season != 2020:
-            last_week = max(season_weeks) - 1
-        else:
-            last_week = max(season_weeks)
-
-        final_top10 = elo[(elo['season'] == season) & (elo['week'] == last_week)]
-        final_top10 = final_top10.sort_values(by='rolling_elo', ascending=False).head(10)
-        top_teams = final_top10['team_name'].tolist()
-
-        plt.figure(figsize=(10, 6))
-        for team in top_teams:
-            team_data = elo[(elo['season'] == season) & (elo['team_name'] == team)]
-            plt.plot(team_data['week'], team_data['rolling_elo'], label=team)
-
-        plt.title(f"Elo Ratings Over Time – Top 10 Teams (Season {season})")
-        plt.xlabel("Week")
-        plt.ylabel("Elo Rating")
-        plt.grid(True)
-        plt.legend(loc="best", fontsize="x-small")
-        plt.tight_layout()
+    # Weekly top 10 with Elo deltas, ranked in SQLite and streamed one season at a time
+    for season, leaders in weekly_leaders(conn, n, first_season, last_season):
+        for week, top10 in leaders.groupby('week'):
+            print(f"\n Season {season} – Week {week} Top 10 Elo")
+            print(top10[['team_name', 'rolling_elo', 'elo_delta']].round(1).to_string(index=False))
+
+        # Plot the season's final top 10
+        final_top10 = leaders[leaders['week'] == final_week(season, leaders['week'].unique())]
+        teams = list(zip(final_top10['team_id'], final_top10['team_name']))
+        series = season_series(team_history(conn, season, final_top10['team_id']), teams)
+
+        fig, ax = plt.subplots(figsize=(10, 6))
+        plot_season(ax, season, series)
+        fig.tight_layout()
         plt.show()
 
-# Run it
-print_weekly_top10_and_plot_by_season("../db_management/cfb_stats.db")
+    conn.close()
+
+def load_chart_data(db_path, first_season=None, last_season=None, n=10):
+    # Everything the charts need, grouped by season up front: [(season, series), ...]
+    conn = connect(db_path)
+    last_weeks = conn.execute("""
+        SELECT season, MAX(week) FROM rolling_team_stats
+        WHERE rolling_elo IS NOT NULL AND season BETWEEN COALESCE(?, season) AND COALESCE(?, season)
+        GROUP BY season ORDER BY season
+    """, (first_season, last_season)).fetchall()
+
+    charts = []
+    for season, max_week in last_weeks:
+        final_top10 = week_leaders(conn, season, final_week(season, [max_week]), n)
+        teams = list(zip(final_top10['team_id'], final_top10['team_name']))
+        charts.append((season, season_series(team_history(conn, season, final_top10['team_id']), teams)))
+    conn.close()
+    return charts
+
+def render_chart(job):
+    # Worker: draw one season on an Agg canvas (no pyplot, no display) and save it
+    season, series, out_dir, fmt = job
+    fig = Figure(figsize=(10, 6))
+    plot_season(fig.subplots(), season, series)
+    fig.tight_layout()
+    path = os.path.join(out_dir, f"elo_top10_{season}.{fmt}")
+    fig.savefig(path)
+    return {'season': season, 'file': os.path.basename(path), 'teams': [team for team, _, _ in series]}
+
+def render_season_charts(db_path, out_dir=PLOT_DIR, fmt="png", workers=None, first_season=None, last_season=None,
+                         metrics=None):
+    # Headless batch mode: every season's chart written to out_dir in parallel, plus index.json / index.html
+    metrics = metrics or RunMetrics("elorankDisplay")
+    os.makedirs(out_dir, exist_ok=True)
+    with metrics.stage("load"):
+        charts = load_chart_data(db_path, first_season, last_season)
+    jobs = [(season, series, out_dir, fmt) for season, series in charts]
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    index = []
+    with metrics.stage("render"), (Pool(workers) if workers > 1 else contextlib.nullcontext()) as pool:
+        # Charts come back in season order, each reported as soon as it is saved
+        for entry in pool.imap(render_chart, jobs) if pool else map(render_chart, jobs):
+            index.append(entry)
+            metrics.season_counts(entry['season'], teams_plotted=len(entry['teams']))
+            metrics.season_progress(entry['season'])
+
+    with open(os.path.join(out_dir, "index.json"), "w") as f:
+        json.dump(index, f, indent=2, default=int)
+    with open(os.path.join(out_dir, "index.html"), "w") as f:
+        f.write("<html><body><h1>Elo Ratings Over Time – Top 10 Teams</h1>\n")
+        for entry in index:
+            f.write(f'<h2>Season {entry["season"]}</h2><img src="{entry["file"]}">\n')
+        f.write("</body></html>\n")
+
+    print(f"[OK] Rendered {len(index)} season charts to {out_dir} ({workers} workers).")
+    return index
+
+# Run it (--render writes every season's chart to disk instead of opening windows)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Weekly top-10 Elo tables and season Elo charts.")
+    parser.add_argument("--db", default="../db_management/cfb_stats.db")
+    parser.add_argument("--render", nargs="?", const=PLOT_DIR, default=None, metavar="DIR",
+                        help="headless: save charts to DIR (default %(const)s) with an index")
+    parser.add_argument("--format", choices=["png", "svg"], default="png")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seasons", type=int, nargs=2, metavar=("FIRST", "LAST"), default=(None, None))
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.render:
+        metrics = RunMetrics.from_argv("elorankDisplay")
+        render_season_charts(args.db, args.render, args.format, args.workers, *args.seasons, metrics=metrics)
+        metrics.report()
+    else:
+        print_weekly_top10_and_plot_by_season(args.db, first_season=args.seasons[0], last_season=args.seasons[1])
@@ -1,108 +1,306 @@
-import sqlite3
+import os
+import sys
+import time
+from multiprocessing import Pool
 import pandas as pd
 import numpy as np
 
-def update_elo_ratings(db_path, base_k=20, decay_factor=0.95, verbose=True):
-    conn = sqlite3.connect(db_path)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_management"))
+from createDB import bulk_update, connect, count_through, usable_watermark, write_watermark
+from runMetrics import RunMetrics
+from seasonStore import load_store, season_chunks
 
-    # Load all required data
-    games = pd.read_sql_query("""
-        SELECT * FROM games
-        WHERE game_type = 'regular'
-        ORDER BY season, week
-    """, conn)
+def build_game_arrays(games, ranks):
+    # (season, week, team_id) -> (points_scored_rank, points_allowed_rank), joined onto every game once
+    rank_index = ranks[['season', 'week', 'team_id', 'points_scored_rank', 'points_allowed_rank']]
+    home_rank = games[['season', 'week', 'home_team_id']].merge(
+        rank_index.rename(columns={'team_id': 'home_team_id'}),
+        on=['season', 'week', 'home_team_id'], how='left', indicator=True)
+    away_rank = games[['season', 'week', 'away_team_id']].merge(
+        rank_index.rename(columns={'team_id': 'away_team_id'}),
+        on=['season', 'week', 'away_team_id'], how='left', indicator=True)
 
-    teams = pd.read_sql_query("SELECT * FROM teams", conn)
-    ranks = pd.read_sql_query("SELECT * FROM rolling_team_stats", conn)
+    # Skip incomplete data
+    complete = (games['score_home'].notna() & games['score_away'].notna()).to_numpy()
 
-    elo_history = []
+    return {
+        'game_id': games['game_id'].to_numpy(dtype=np.int64)[complete],
+        'season': games['season'].to_numpy()[complete],
+        'week': games['week'].to_numpy()[complete],
+        'home': games['home_team_id'].to_numpy(dtype=np.int64)[complete],
+        'away': games['away_team_id'].to_numpy(dtype=np.int64)[complete],
+        'home_win': (games['score_home'] > games['score_away']).to_numpy(dtype=np.float64)[complete],
+        'rank_home_off': home_rank['points_scored_rank'].to_numpy(dtype=np.float64)[complete],
+        'rank_away_def': away_rank['points_allowed_rank'].to_numpy(dtype=np.float64)[complete],
+        'has_ranks': ((home_rank['_merge'] == 'both') & (away_rank['_merge'] == 'both')).to_numpy()[complete],
+    }
 
-    # Step 1: Loop by season
-    for season in sorted(games['season'].unique()):
-        if verbose:
-            print(f"\n[LOADING] Starting Elo for Season {season}")
+def conflict_free_batches(home, away):
+    # Split a week's games into batches where no team plays twice, keeping each team's game order
+    if np.unique(np.concatenate([home, away])).size == 2 * home.size:
+        return [np.arange(home.size)]
 
-        # Step 2: Init Elo per team
-        current_elo = {team_id: 1500 for team_id in teams['team_id']}
+    last_batch = {}
+    batch_of = np.empty(home.size, dtype=np.int64)
+    for i, (h, a) in enumerate(zip(home.tolist(), away.tolist())):
+        batch_of[i] = max(last_batch.get(h, -1), last_batch.get(a, -1)) + 1
+        last_batch[h] = last_batch[a] = batch_of[i]
+    return [np.flatnonzero(batch_of == b) for b in range(batch_of.max() + 1)]
 
-        season_games = games[games['season'] == season]
+def play_week_arrays(current_elo, game_arrays, week_idx, week, base_k, decay_factor, rank_divisor=25, batches=None):
+    # Update current_elo in place for one week of games; returns post-game Elos and pre-game expectations
+    home, away = game_arrays['home'][week_idx], game_arrays['away'][week_idx]
 
-        for week in sorted(season_games['week'].unique()):
-            week_games = season_games[season_games['week'] == week]
+    # Rank difference modifier (better rank → lower number)
+    rank_diff_mod = np.where(
+        game_arrays['has_ranks'][week_idx],
+        (game_arrays['rank_away_def'][week_idx] - game_arrays['rank_home_off'][week_idx]) / rank_divisor,  # e.g. -1.0 to 1.0 range
+        0.0)
 
-            for _, game in week_games.iterrows():
-                home, away = game['home_team_id'], game['away_team_id']
-                score_home, score_away = game['score_home'], game['score_away']
+    # Week decay
+    week_decay = decay_factor ** (week - 1)
 
-                if pd.isna(score_home) or pd.isna(score_away):
-                    continue  # Skip incomplete data
+    # Final modifier
+    k = base_k * week_decay * (1 + rank_diff_mod)
+    actual_home = game_arrays['home_win'][week_idx]
 
-                # Step 3: Compute Expected values
-                elo_home = current_elo[home]
-                elo_away = current_elo[away]
+    home_after = np.empty(week_idx.size)
+    away_after = np.empty(week_idx.size)
+    expected = np.empty(week_idx.size)
+    for batch in (batches if batches is not None else conflict_free_batches(home, away)):
+        h, a = home[batch], away[batch]
 
-                expected_home = 1 / (1 + 10 ** ((elo_away - elo_home) / 400))
-                expected_away = 1 - expected_home
+        # Step 3: Compute Expected values
+        expected_home = 1 / (1 + 10 ** ((current_elo[a] - current_elo[h]) / 400))
 
-                actual_home = 1 if score_home > score_away else 0
-                actual_away = 1 - actual_home
+        # Step 4: Elo update
+        change_home = k[batch] * (actual_home[batch] - expected_home)
+        current_elo[h] += change_home
+        current_elo[a] -= change_home
 
-                # Rank difference modifier (better rank → lower number)
-                rank_home_off = ranks.query(f"season == {season} and week == {week} and team_id == {home}")['points_scored_rank'].values
-                rank_away_def = ranks.query(f"season == {season} and week == {week} and team_id == {away}")['points_allowed_rank'].values
+        home_after[batch] = current_elo[h]
+        away_after[batch] = current_elo[a]
+        expected[batch] = expected_home
 
-                if len(rank_home_off) > 0 and len(rank_away_def) > 0:
-                    rank_diff_mod = ((rank_away_def[0] - rank_home_off[0]) / 25)  # e.g. -1.0 to 1.0 range
-                else:
-                    rank_diff_mod = 0
+    return home_after, away_after, expected
 
-                # Week decay
-                week_decay = decay_factor ** (week - 1)
+def play_week(current_elo, game_arrays, week_idx, season, week, base_k, decay_factor, rank_divisor=25):
+    # Update current_elo in place for one week of games and return the post-game snapshots
+    home_after, away_after, _ = play_week_arrays(
+        current_elo, game_arrays, week_idx, week, base_k, decay_factor, rank_divisor)
 
-                # Final modifier
-                k = base_k * week_decay * (1 + rank_diff_mod)
+    # Save elo snapshots, home then away for each game
+    home, away = game_arrays['home'][week_idx], game_arrays['away'][week_idx]
+    return pd.DataFrame({
+        'team_id': np.column_stack([home, away]).ravel(),
+        'season': season,
+        'week': week,
+        'rolling_elo': np.column_stack([home_after, away_after]).ravel(),
+    })
 
-                # Step 4: Elo update
-                change_home = k * (actual_home - expected_home)
-                change_away = -change_home
+def season_slices(game_arrays):
+    # Seasons are independent once Elo resets, so each gets its own slice of the game arrays
+    seasons = game_arrays['season']
+    bounds = np.flatnonzero(np.diff(seasons) != 0) + 1
+    for idx in np.split(np.arange(seasons.size), bounds):
+        if idx.size:
+            yield int(seasons[idx[0]]), {name: values[idx] for name, values in game_arrays.items()}
 
-                current_elo[home] += change_home
-                current_elo[away] += change_away
+def play_season(task):
+    # One season's weekly snapshots and final Elo; start_elo is None for a fresh 1500 start
+    season, season_arrays, start_elo, n_slots, base_k, decay_factor, rank_divisor = task
+    start = time.perf_counter()
+    current_elo = np.full(n_slots, 1500.0) if start_elo is None else start_elo.copy()
+    history = []
+    for week in np.unique(season_arrays['week']):
+        week_idx = np.flatnonzero(season_arrays['week'] == week)
+        history.append(play_week(current_elo, season_arrays, week_idx, season, week, base_k, decay_factor, rank_divisor))
+    history = pd.concat(history, ignore_index=True)  # one frame per season keeps the pool's pickling cheap
+    return season, history, current_elo, season_arrays['week'].size, time.perf_counter() - start
 
-                # Save elo snapshot
-                elo_history.append({
-                    'team_id': home,
-                    'season': season,
-                    'week': week,
-                    'rolling_elo': current_elo[home]
-                })
-                elo_history.append({
-                    'team_id': away,
-                    'season': season,
-                    'week': week,
-                    'rolling_elo': current_elo[away]
-                })
+def rank_elo(conn, after=(0, 0), through=None):
+    # elo_rank from the real ratings (fillRanks only ranks its 1500 placeholder); ties share the best rank.
+    # through: last season to rank (default: every season after `after`)
+    conn.execute(f"""
+        UPDATE rolling_team_stats AS r SET elo_rank = k.elo_rank
+        FROM (
+            SELECT team_id, season, week,
+                   RANK() OVER (PARTITION BY season, week ORDER BY rolling_elo DESC) AS elo_rank
+            FROM rolling_team_stats
+            WHERE (season, week) > (?, ?){" AND season <= ?" if through is not None else ""}
+        ) AS k
+        WHERE r.team_id = k.team_id AND r.season = k.season AND r.week = k.week
+    """, tuple(int(v) for v in after) + ((int(through),) if through is not None else ()))
 
-            if verbose:
-                sample = pd.DataFrame([
-                    {'team': tid, 'elo': round(e, 1)} for tid, e in current_elo.items()
-                ]).sort_values(by='elo', ascending=False).head(3)
-                print(f"  [OK] Week {week} top 3 Elos:\n{sample.to_string(index=False)}")
+def write_elo(conn, elo_df, ranks, after, metrics, through=None):
+    # A team's last game of the week wins; teams without a rolling_team_stats row that week (no earlier
+    # game yet) have nowhere to store a snapshot, and are counted rather than staged
+    keys = ['team_id', 'season', 'week']
+    elo_df = elo_df.drop_duplicates(keys, keep='last')
+    stored = elo_df.merge(ranks[keys], on=keys)
+    metrics.count("rows_without_stats", len(elo_df) - len(stored))
+    bulk_update(conn, "rolling_team_stats", keys, ["rolling_elo"],
+                zip(*(stored[c].tolist() for c in [*keys, 'rolling_elo'])))
+    rank_elo(conn, after, through)
 
-    # Step 5: Write back updated Elo to rolling_team_stats
-    elo_df = pd.DataFrame(elo_history)
-
-    for _, row in elo_df.iterrows():
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE rolling_team_stats
-            SET rolling_elo = ?
-            WHERE team_id = ? AND season = ? AND week = ?
-        """, (row['rolling_elo'], row['team_id'], row['season'], row['week']))
+def save_elo_state(conn, team_ids, current_elo, last, params, seen=None):
+    # Save where this run stopped so the next incremental run can pick up from here
+    conn.execute("DELETE FROM elo_state")
+    conn.executemany("INSERT INTO elo_state (team_id, elo) VALUES (?, ?)",
+                     zip(team_ids.tolist(), current_elo[team_ids].tolist()))
+    write_watermark(conn, "elo", last[0], last[1], params, seen)
     conn.commit()
+
+def saved_elo_state(conn, n_slots):
+    current_elo = np.full(n_slots, 1500.0)
+    saved = conn.execute("SELECT team_id, elo FROM elo_state").fetchall()
+    if saved:
+        saved_ids, saved_elo = map(np.array, zip(*saved))
+        current_elo[saved_ids.astype(np.int64)] = saved_elo
+    return current_elo
+
+def stream_elo_ratings(conn, after, through, watermark, params, base_k, decay_factor, rank_divisor, metrics):
+    # One season at a time: read its games and ranks, play it, write and commit it before reading the next.
+    # Only the current Elo array carries over, so peak memory is one season's games however long the history
+    team_ids = np.array([t for (t,) in conn.execute(
+        "SELECT team_id FROM teams UNION SELECT home_team_id FROM games UNION SELECT away_team_id FROM games")],
+        dtype=np.int64)
+    n_slots = int(team_ids.max(initial=0)) + 1
+    current_elo = saved_elo_state(conn, n_slots) if watermark else np.full(n_slots, 1500.0)
+
+    chunks = season_chunks(conn, after, columns=None, through=through)
+    seen, mark = count_through(conn, *after), after  # running watermark counts, so each season only counts its own weeks
+    played = False
+    while True:
+        with metrics.stage("load"):
+            season, games, _ = next(chunks, (None, None, None))
+            if games is None:
+                break
+            ranks = pd.read_sql_query("""
+                SELECT season, week, team_id, points_scored_rank, points_allowed_rank FROM rolling_team_stats
+                WHERE season = ? AND (season, week) > (?, ?)
+            """, conn, params=(season, *after))
+            season_arrays = build_game_arrays(games, ranks)
+
+        # Init Elo per team at 1500 each season, unless continuing the watermark's season; a season with no
+        # completed games yet only moves the watermark
+        history = None
+        with metrics.stage("ratings"):
+            if season_arrays['week'].size:
+                start_elo = current_elo if watermark and season == after[0] else None
+                _, history, current_elo, n_games, seconds = play_season(
+                    (season, season_arrays, start_elo, n_slots, base_k, decay_factor, rank_divisor))
+                metrics.season_counts(season, games_processed=n_games, rows_written=len(history))
+                metrics.seasons[season]['seconds'] = round(seconds, 4)
+
+        with metrics.stage("write"):
+            if history is not None:
+                write_elo(conn, history, ranks, mark, metrics, through=season)
+            last = tuple(games[['season', 'week']].iloc[-1].tolist())
+            seen = tuple(map(sum, zip(seen, count_through(conn, *last, after=mark))))
+            save_elo_state(conn, team_ids, current_elo, last, params, seen)
+            mark = last
+        metrics.season_progress(season)
+        played = True
+    return played
+
+def update_elo_ratings(db_path, base_k=20, decay_factor=0.95, verbose=True, incremental=False, rank_divisor=25,
+                       metrics=None, workers=1, streaming=False):
+    metrics = metrics or RunMetrics("fillElo", verbose=verbose)
+    conn = connect(db_path)
+
+    # Incremental runs resume from the saved Elo of the last processed week
+    params = f"base_k={base_k!r},decay_factor={decay_factor!r},rank_divisor={rank_divisor!r}"
+    watermark = usable_watermark(conn, "elo", params) if incremental else None
+    if incremental and watermark is None:
+        print("[WARNING] No usable Elo watermark for these parameters — running a full rebuild.")
+    after = watermark or (0, 0)
+
+    # K reads fillRanks' rank rows, so Elo never runs (or moves its watermark) past the last week fillRanks wrote
+    # for the current history; later weeks wait for the next fillRanks run
+    through = usable_watermark(conn, "ranks")
+    if through is None:
+        conn.close()
+        print("[WARNING] Rolling stats are missing or out of date — run fillRanks before fillElo.")
+        return metrics.report()
+    through = tuple(through)
+    if conn.execute("SELECT 1 FROM games WHERE game_type = 'regular' AND (season, week) > (?, ?) LIMIT 1", through).fetchone():
+        print(f"[WARNING] Rolling stats end at Season {through[0]}, Week {through[1]} — later weeks wait for fillRanks.")
+
+    if streaming:
+        # Bounded-memory full-history rebuilds: seasons are read, played and committed one after another
+        played = stream_elo_ratings(conn, after, through, watermark, params, base_k, decay_factor, rank_divisor, metrics)
+        conn.close()
+        if played:
+            print("\n[OK] Elo ratings updated for all games, one season at a time.")
+        else:
+            print(f"\n[OK] Elo ratings already up to date through Season {after[0]}, Week {after[1]}.")
+        return metrics.report()
+
+    # Load all required data
+    with metrics.stage("load"):
+        store = load_store(db_path)
+        games = store.games_frame(after)
+        games = games[(games['season'] < through[0])
+                      | ((games['season'] == through[0]) & (games['week'] <= through[1]))].reset_index(drop=True)
+
+        if games.empty:
+            conn.close()
+            print(f"\n[OK] Elo ratings already up to date through Season {after[0]}, Week {after[1]}.")
+            return metrics.report()
+
+        teams = store.teams_frame()
+        ranks = pd.read_sql_query("""
+            SELECT season, week, team_id, points_scored_rank, points_allowed_rank FROM rolling_team_stats
+            WHERE (season, week) > (?, ?)
+        """, conn, params=after)
+
+        # Step 1: Precompute each game's rank lookups once
+        game_arrays = build_game_arrays(games, ranks)
+
+    # Elo lives in an array indexed by team_id
+    n_slots = int(max(teams['team_id'].max(), games['home_team_id'].max(), games['away_team_id'].max())) + 1
+    team_ids = teams['team_id'].to_numpy()
+    current_elo = saved_elo_state(conn, n_slots) if watermark else np.full(n_slots, 1500.0)
+
+    # Step 2: Init Elo per team at 1500 each season, unless continuing the watermark's season
+    saved_elo = current_elo if watermark else None
+    tasks = [(season, season_arrays, saved_elo if season == after[0] else None,
+              n_slots, base_k, decay_factor, rank_divisor)
+             for season, season_arrays in season_slices(game_arrays)]
+
+    elo_history = []
+    with metrics.stage("ratings"):
+        workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+        if workers == 1:
+            results = [play_season(task) for task in tasks]
+        else:
+            with Pool(workers) as pool:
+                results = pool.map(play_season, tasks)  # merged in season order, as the serial loop would
+
+        for season, history, season_elo, n_games, seconds in results:
+            elo_history.append(history)
+            current_elo = season_elo
+            metrics.season_counts(season, games_processed=n_games, rows_written=len(history))
+            metrics.seasons[season]['seconds'] = round(seconds, 4)
+            metrics.season_progress(season)
+
+    # Step 5: Write back updated Elo to rolling_team_stats
+    with metrics.stage("write"):
+        elo_df = pd.concat(elo_history, ignore_index=True) if elo_history else pd.DataFrame(
+            columns=['team_id', 'season', 'week', 'rolling_elo'])
+
+        write_elo(conn, elo_df, ranks, after, metrics)
+        save_elo_state(conn, team_ids, current_elo, games[['season', 'week']].iloc[-1].tolist(), params)
     conn.close()
 
     print("\n{SUCCESS] Elo ratings updated for all games.")
+    return metrics.report()
 
-# Run it
-update_elo_ratings("../db_management/cfb_stats.db", base_k=25, decay_factor=0.97, verbose=True)
+# Run it (--incremental: only weeks loaded since the last run; --workers N: seasons in parallel;
+# --streaming: season-at-a-time, bounded memory (serial); --profile / --trace-memory / --report PATH: instrumentation)
+if __name__ == "__main__":
+    workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else 1
+    update_elo_ratings("../db_management/cfb_stats.db", base_k=25, decay_factor=0.97, verbose=True,
+                       incremental="--incremental" in sys.argv, metrics=RunMetrics.from_argv("fillElo"),
+                       workers=workers, streaming="--streaming" in sys.argv)
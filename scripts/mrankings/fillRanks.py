@@ -1,20 +1,112 @@
-import sqlite3
+import os
+import sys
+import numpy as np
 import pandas as pd
 
-def compute_rolling_team_stats(db_path, verbose=True):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    games = pd.read_sql_query("""
-        SELECT * FROM games
-        WHERE game_type = 'regular'
-        ORDER BY season, week
-    """, conn)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_management"))
+from createDB import connect, count_through, usable_watermark, write_watermark, clear_watermark
+from runMetrics import RunMetrics
+from seasonStore import load_store, season_chunks
+
+# (rolling column, source column, whose row it comes from)
+ROLLING_SOURCES = [
+    ("rolling_pass_yards_for", "pass_yards", "team"),
+    ("rolling_rush_yards_for", "rush_yards", "team"),
+    ("rolling_total_yards_for", "total_yards", "team"),
+    ("rolling_points_scored", "points_scored", "game"),
+    ("rolling_pass_yards_against", "pass_yards", "opp"),
+    ("rolling_rush_yards_against", "rush_yards", "opp"),
+    ("rolling_total_yards_against", "total_yards", "opp"),
+    ("rolling_points_allowed", "points_allowed", "game"),
+]
+
+def build_team_game_table(games, team_game_stats):
+    # One row per team per game, with the team's and the opponent's box score joined once
+    home = games[['game_id', 'season', 'week']].assign(
+        team_id=games['home_team_id'], opponent_id=games['away_team_id'],
+        points_scored=games['score_home'], points_allowed=games['score_away'])
+    away = games[['game_id', 'season', 'week']].assign(
+        team_id=games['away_team_id'], opponent_id=games['home_team_id'],
+        points_scored=games['score_away'], points_allowed=games['score_home'])
+    team_games = pd.concat([home, away], ignore_index=True)
+
+    box = team_game_stats[['game_id', 'team_id', 'pass_yards', 'rush_yards', 'total_yards']].assign(has_stats=1)
+    team_games = team_games.merge(box, on=['game_id', 'team_id'], how='left')
+    team_games = team_games.merge(
+        box.rename(columns={'team_id': 'opponent_id'}), on=['game_id', 'opponent_id'], how='left', suffixes=('', '_opp'))
+    team_games[['has_stats', 'has_stats_opp']] = team_games[['has_stats', 'has_stats_opp']].fillna(0)
+    return team_games
+
+ACCUMULATORS = ['games', 'has_stats', 'has_stats_opp'] + [
+    f"{name}_{part}" for name, _, _ in ROLLING_SOURCES for part in ('sum', 'n')]
+
+def weekly_totals(games, team_game_stats):
+    # Per (team, season, week) sums and non-null counts of every rolling stat
+    team_games = build_team_game_table(games, team_game_stats)
+
+    sums = {'games': ('game_id', 'size'), 'has_stats': ('has_stats', 'sum'), 'has_stats_opp': ('has_stats_opp', 'sum')}
+    for name, source, side in ROLLING_SOURCES:
+        column = f"{source}_opp" if side == "opp" else source
+        sums[f"{name}_sum"] = (column, 'sum')
+        sums[f"{name}_n"] = (column, 'count')
+    return team_games.groupby(['team_id', 'season', 'week'], sort=True).agg(**sums).reset_index()
+
+def build_rolling_means(weekly, start_totals=None, metrics=None):
+    # Career-to-date means using only games from earlier weeks, continuing from start_totals (indexed by team_id)
+    values = weekly[ACCUMULATORS].astype(np.float64)
+    totals = values.groupby(weekly['team_id']).cumsum()
+    if start_totals is not None:
+        totals += start_totals.reindex(weekly['team_id'], fill_value=0.0)[ACCUMULATORS].to_numpy()
+    prior = totals - values
+
+    keep = (prior['games'] > 0) & (prior['has_stats'] > 0) & (prior['has_stats_opp'] > 0)
+    if metrics is not None:
+        skipped = pd.DataFrame({
+            'skipped_no_prior_games': prior['games'] == 0,
+            'skipped_missing_stats': (prior['games'] > 0) & ~keep,
+        }).groupby(weekly['season']).sum()
+        for season, counts in skipped.iterrows():
+            metrics.season_counts(season, **counts)
+
+    rolling_df = weekly.loc[keep, ['team_id', 'season', 'week']].copy()
+    for name, _, _ in ROLLING_SOURCES:
+        counts = prior.loc[keep, f"{name}_n"]
+        rolling_df[name] = (prior.loc[keep, f"{name}_sum"] / counts).where(counts > 0, np.nan)
+
+    # Totals through the last week played, to carry into the next incremental run
+    end_totals = values.groupby(weekly['team_id']).sum()
+    if start_totals is not None:
+        end_totals = start_totals[ACCUMULATORS].add(end_totals, fill_value=0.0)
+    return rolling_df.reset_index(drop=True), end_totals
+
+def load_accumulators(conn):
+    return pd.read_sql_query("SELECT * FROM rolling_accumulators", conn, index_col='team_id')
+
+def save_accumulators(conn, end_totals):
+    conn.execute("DELETE FROM rolling_accumulators")
+    rows = end_totals[ACCUMULATORS].reset_index()
+    conn.executemany(f"""
+        INSERT INTO rolling_accumulators (team_id, {", ".join(ACCUMULATORS)})
+        VALUES ({", ".join("?" * len(rows.columns))})
+    """, _to_sql_rows(rows))
+
+def _to_sql_rows(df):
+    # Plain Python scalars so sqlite3 binds ints/floats/NULLs natively
+    return [
+        tuple(None if pd.isna(v) else v for v in row)
+        for row in df.astype(object).itertuples(index=False, name=None)
+    ]
 
-    team_game_stats = pd.read_sql_query("SELECT * FROM team_game_stats", conn)
+def compute_rolling_team_stats(db_path, verbose=True, incremental=False, metrics=None, streaming=False):
+    metrics = metrics or RunMetrics("fillRanks", verbose=verbose)
+    conn = connect(db_path)
+    cursor = conn.cursor()
 
-    cursor.execute("DELETE FROM rolling_team_stats")
-    conn.commit()
+    # Incremental runs pick up after the last processed week, if the history behind it is unchanged
+    watermark = usable_watermark(conn, "ranks") if incremental else None
+    if incremental and watermark is None:
+        print("[WARNING] No usable watermark for rolling stats — running a full rebuild.")
+    after = watermark or (0, 0)
 
     rolling_stats = [
         "rolling_pass_yards_for", "rolling_rush_yards_for", "rolling_total_yards_for", "rolling_points_scored",
@@ -26,118 +118,95 @@ def compute_rolling_team_stats(db_path, verbose=True):
         "pass_yards_against_rank", "rush_yards_against_rank", "total_yards_against_rank", "points_allowed_rank",
         "elo_rank"
     ]
-
-    for (season, week), week_games in games.groupby(["season", "week"]):
-        if verbose:
-            print(f"\n[LOADING] Processing Season {season}, Week {week}")
-
-        team_ids = pd.concat([
-            week_games[["home_team_id"]].rename(columns={"home_team_id": "team_id"}),
-            week_games[["away_team_id"]].rename(columns={"away_team_id": "team_id"})
-        ]).drop_duplicates()['team_id'].tolist()
-
-        week_data = []
-
-        for team_id in team_ids:
-            if verbose:
-                print(f"  [LOADING] Team {team_id}")
-
-            prior_games = games[
-                ((games['home_team_id'] == team_id) | (games['away_team_id'] == team_id)) &
-                ((games['season'] < season) | ((games['season'] == season) & (games['week'] < week)))
-            ]
-            if prior_games.empty:
-                if verbose:
-                    print("     [ERROR]  No prior games — skipping.")
-                continue
-
-            game_ids = prior_games['game_id'].tolist()
-            team_stats = team_game_stats[
-                (team_game_stats['team_id'] == team_id) &
-                (team_game_stats['game_id'].isin(game_ids))
-            ]
-
-            opponent_stats_list = []
-            for gid in game_ids:
-                game_row = prior_games[prior_games['game_id'] == gid].iloc[0]
-                opponent_id = game_row['away_team_id'] if game_row['home_team_id'] == team_id else game_row['home_team_id']
-                opp_stats = team_game_stats[
-                    (team_game_stats['game_id'] == gid) &
-                    (team_game_stats['team_id'] == opponent_id)
-                ]
-                if not opp_stats.empty:
-                    opponent_stats_list.append(opp_stats.iloc[0])
-
-            if team_stats.empty or not opponent_stats_list:
-                if verbose:
-                    print("     [ERROR]  Missing stats — skipping.")
-                continue
-
-            opponent_stats = pd.DataFrame(opponent_stats_list)
-
-            team_games = prior_games.copy()
-            team_games['is_home'] = team_games['home_team_id'] == team_id
-            team_games['points_scored'] = team_games.apply(lambda row:
-                row['score_home'] if row['is_home'] else row['score_away'], axis=1)
-            team_games['points_allowed'] = team_games.apply(lambda row:
-                row['score_away'] if row['is_home'] else row['score_home'], axis=1)
-
-            row = {
-                'team_id': team_id,
-                'season': season,
-                'week': week,
-                'rolling_pass_yards_for': team_stats['pass_yards'].mean(),
-                'rolling_rush_yards_for': team_stats['rush_yards'].mean(),
-                'rolling_total_yards_for': team_stats['total_yards'].mean(),
-                'rolling_points_scored': team_games['points_scored'].mean(),
-                'rolling_pass_yards_against': opponent_stats['pass_yards'].mean(),
-                'rolling_rush_yards_against': opponent_stats['rush_yards'].mean(),
-                'rolling_total_yards_against': opponent_stats['total_yards'].mean(),
-                'rolling_points_allowed': team_games['points_allowed'].mean(),
-                'rolling_elo': 1500.0  # placeholder
-            }
-
-            week_data.append(row)
-
-        week_df = pd.DataFrame(week_data)
-
-        if week_df.empty:
-            if verbose:
-                print("  [ERROR]  No valid teams to rank this week.")
-            continue
-
-        for stat, rank in zip(rolling_stats, rank_fields):
-            week_df[rank] = week_df[stat].rank(ascending=False, method='min')
-
-        for _, row in week_df.iterrows():
-            cursor.execute(f"""
-                INSERT INTO rolling_team_stats (
-                    team_id, season, week,
-                    rolling_pass_yards_for, rolling_rush_yards_for, rolling_total_yards_for, rolling_points_scored,
-                    rolling_pass_yards_against, rolling_rush_yards_against, rolling_total_yards_against, rolling_points_allowed,
-                    rolling_elo,
-                    pass_yards_for_rank, rush_yards_for_rank, total_yards_for_rank, points_scored_rank,
-                    pass_yards_against_rank, rush_yards_against_rank, total_yards_against_rank, points_allowed_rank,
-                    elo_rank
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                row['team_id'], row['season'], row['week'],
-                row['rolling_pass_yards_for'], row['rolling_rush_yards_for'], row['rolling_total_yards_for'], row['rolling_points_scored'],
-                row['rolling_pass_yards_against'], row['rolling_rush_yards_against'], row['rolling_total_yards_against'], row['rolling_points_allowed'],
-                row['rolling_elo'],
-                row['pass_yards_for_rank'], row['rush_yards_for_rank'], row['total_yards_for_rank'], row['points_scored_rank'],
-                row['pass_yards_against_rank'], row['rush_yards_against_rank'], row['total_yards_against_rank'], row['points_allowed_rank'],
-                row['elo_rank']
-            ))
-
-        conn.commit()
-
-        if verbose:
-            print("  [OK] Weekly stats and ranks updated:")
-            print(week_df[['team_id', 'rolling_total_yards_for', 'total_yards_for_rank']].sort_values(by='total_yards_for_rank').head())
+    box_stats = ["pass_yards", "rush_yards", "total_yards"]
+
+    if streaming:
+        # One season at a time straight from SQL, written and committed before the next is read; only the
+        # per-team accumulators carry over, so peak memory is one season's games however long the history
+        chunks = season_chunks(conn, after, columns=box_stats)
+    else:
+        # Regular-season games and box scores after the watermark, from the shared season store, in one chunk
+        def load_all():
+            store = load_store(db_path)
+            yield None, store.games_frame(after), store.team_game_stats_frame(after, columns=box_stats)
+        chunks = load_all()
+
+    totals = load_accumulators(conn) if watermark else None
+    seen, mark = count_through(conn, *after), after  # running watermark counts, so each chunk only counts its own weeks
+    started = False
+    while True:
+        with metrics.stage("load"):
+            games, team_game_stats = next(chunks, (None, None, None))[1:]
+        if games is None or games.empty:
+            break
+
+        if not started:
+            cursor.execute("DELETE FROM rolling_team_stats WHERE (season, week) > (?, ?)", after)
+            if watermark is None:
+                # Elo state was built on the rows being replaced
+                clear_watermark(conn, "elo")
+            started = True
+        seasons = games['season'].value_counts().sort_index()
+        for season, n in seasons.items():
+            metrics.season_counts(season, games_processed=n)
+
+        # Build every team's rolling means in one pass, then rank each week
+        with metrics.stage("rolling_means"):
+            rolling_df, totals = build_rolling_means(weekly_totals(games, team_game_stats), totals, metrics)
+            rolling_df['rolling_elo'] = 1500.0  # placeholder
+
+        with metrics.stage("rank"):
+            rank_df = rolling_df.groupby(["season", "week"])[rolling_stats].rank(ascending=False, method='min')
+            rank_df.columns = rank_fields
+            rolling_df = pd.concat([rolling_df, rank_df], axis=1)
+
+        # Rows, carry-over totals and watermark commit together, so an interrupted stream resumes incrementally.
+        # Rows go out a season at a time, with that season's progress line as soon as it is written
+        with metrics.stage("write"):
+            rows_by_season = dict(tuple(rolling_df.groupby('season', sort=True)))
+            for season in seasons.index:
+                rows = rows_by_season.pop(season, None)
+                if rows is not None:
+                    write_rolling_rows(cursor, rows[["team_id", "season", "week", *rolling_stats, *rank_fields]])
+                    metrics.season_counts(season, rows_written=len(rows))
+                metrics.season_progress(season)
+
+            last = tuple(games[['season', 'week']].iloc[-1].tolist())
+            seen = tuple(map(sum, zip(seen, count_through(conn, *last, after=mark))))
+            save_accumulators(conn, totals)
+            write_watermark(conn, "ranks", *last, seen=seen)
+            conn.commit()
+            mark = last
+
+        del games, team_game_stats, rolling_df, rank_df
+
+    if not started:
+        if watermark is None:
+            cursor.execute("DELETE FROM rolling_team_stats")
+            conn.commit()
+        conn.close()
+        print(f"\n[OK] Rolling stats already up to date through Season {after[0]}, Week {after[1]}.")
+        return metrics.report()
 
     conn.close()
     print("\n[OK] Rolling stats and ranks successfully computed across all seasons and weeks.")
-
-# Run it
-compute_rolling_team_stats("../db_management/cfb_stats.db", verbose=True)
+    return metrics.report()
+
+def write_rolling_rows(cursor, rows):
+    cursor.executemany("""
+        INSERT INTO rolling_team_stats (
+            team_id, season, week,
+            rolling_pass_yards_for, rolling_rush_yards_for, rolling_total_yards_for, rolling_points_scored,
+            rolling_pass_yards_against, rolling_rush_yards_against, rolling_total_yards_against, rolling_points_allowed,
+            rolling_elo,
+            pass_yards_for_rank, rush_yards_for_rank, total_yards_for_rank, points_scored_rank,
+            pass_yards_against_rank, rush_yards_against_rank, total_yards_against_rank, points_allowed_rank,
+            elo_rank
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, _to_sql_rows(rows))
+
+# Run it (--incremental: only weeks loaded since the last run; --streaming: season-at-a-time, bounded memory;
+# --profile / --trace-memory / --report PATH: instrumentation)
+if __name__ == "__main__":
+    compute_rolling_team_stats("../db_management/cfb_stats.db", verbose=True, incremental="--incremental" in sys.argv,
+                               metrics=RunMetrics.from_argv("fillRanks"), streaming="--streaming" in sys.argv)
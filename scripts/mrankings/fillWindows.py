@@ -0,0 +1,182 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_management"))
+from createDB import connect
+from runMetrics import RunMetrics
+from seasonStore import load_store
+from fillRanks import ROLLING_SOURCES, ACCUMULATORS, build_team_game_table, _to_sql_rows
+
+# Window specs: "career", "season" (season-to-date), "lastN" (last N games), "ewmH" (exponential decay, half-life H games)
+WINDOWS = ["season", "last5", "ewm4"]
+
+ROLLING_COLUMNS = [name for name, _, _ in ROLLING_SOURCES]
+RANK_COLUMNS = [name[len("rolling_"):] + "_rank" for name in ROLLING_COLUMNS]
+
+# Every window keeps the same per-team accumulator vector as rolling_accumulators (games, stat sums and counts),
+# updated in constant time per game, so several windows cost one pass over the schedule.
+class CareerWindow:
+    def __init__(self, n_slots):
+        self.totals = np.zeros((n_slots, len(ACCUMULATORS)))
+
+    def new_season(self):
+        pass
+
+    def push(self, teams, values):
+        # teams are unique within one call
+        self.totals[teams] += values
+
+    def state(self, teams):
+        return self.totals[teams]
+
+class SeasonWindow(CareerWindow):
+    def new_season(self):
+        self.totals[:] = 0.0
+
+class LastNWindow(CareerWindow):
+    # Ring buffer of each team's last n games; the running totals swap the oldest game out as a new one comes in
+    def __init__(self, n_slots, n):
+        super().__init__(n_slots)
+        self.buffer = np.zeros((n_slots, n, len(ACCUMULATORS)))
+        self.pos = np.zeros(n_slots, dtype=np.int64)
+        self.n = n
+
+    def push(self, teams, values):
+        slot = self.pos[teams]
+        self.totals[teams] += values - self.buffer[teams, slot]
+        self.buffer[teams, slot] = values
+        self.pos[teams] = (slot + 1) % self.n
+
+class EwmWindow(CareerWindow):
+    # Decayed sums and counts: each new game multiplies a team's earlier games' weight by 0.5 ** (1 / half_life)
+    def __init__(self, n_slots, half_life):
+        super().__init__(n_slots)
+        self.decay = 0.5 ** (1 / half_life)
+
+    def push(self, teams, values):
+        self.totals[teams] = self.totals[teams] * self.decay + values
+
+def make_window(spec, n_slots):
+    if spec == "career":
+        return CareerWindow(n_slots)
+    if spec == "season":
+        return SeasonWindow(n_slots)
+    if spec.startswith("last") and spec[4:].isdigit() and int(spec[4:]) > 0:
+        return LastNWindow(n_slots, int(spec[4:]))
+    if spec.startswith("ewm"):
+        try:
+            half_life = float(spec[3:])
+        except ValueError:
+            half_life = 0
+        if half_life > 0:
+            return EwmWindow(n_slots, half_life)
+    raise ValueError(f"Unknown window {spec!r} (use career, season, lastN or ewmH)")
+
+def game_values(team_games):
+    # One accumulator row per team-game, laid out like ACCUMULATORS
+    values = {'games': np.ones(len(team_games)),
+              'has_stats': team_games['has_stats'], 'has_stats_opp': team_games['has_stats_opp']}
+    for name, source, side in ROLLING_SOURCES:
+        column = team_games[f"{source}_opp" if side == "opp" else source]
+        values[f"{name}_sum"] = column.fillna(0)
+        values[f"{name}_n"] = column.notna()
+    return pd.DataFrame(values)[ACCUMULATORS].to_numpy(np.float64)
+
+def window_means(spec, teams, season, week, totals):
+    # Pre-game means for the teams playing this week, dropping teams with no usable history in the window
+    col = {name: i for i, name in enumerate(ACCUMULATORS)}
+    keep = (totals[:, col['games']] > 0) & (totals[:, col['has_stats']] > 0) & (totals[:, col['has_stats_opp']] > 0)
+    frame = {'window_name': spec, 'team_id': teams[keep], 'season': season, 'week': week}
+    for name in ROLLING_COLUMNS:
+        counts = totals[keep, col[f"{name}_n"]]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frame[name] = np.where(counts > 0, totals[keep, col[f"{name}_sum"]] / counts, np.nan)
+    return pd.DataFrame(frame), int((~keep).sum())
+
+def compute_window_stats(db_path, windows=WINDOWS, verbose=True, metrics=None):
+    metrics = metrics or RunMetrics("fillWindows", verbose=verbose)
+    for spec in windows:
+        make_window(spec, 1)  # reject bad specs before loading anything
+    conn = connect(db_path)
+
+    with metrics.stage("load"):
+        store = load_store(db_path)
+        games = store.games_frame()
+        team_game_stats = store.team_game_stats_frame(columns=["pass_yards", "rush_yards", "total_yards"])
+
+        team_games = build_team_game_table(games, team_game_stats)
+        team_games = team_games.sort_values(['season', 'week', 'game_id'], kind='stable').reset_index(drop=True)
+        # A team's second game in the same week goes in a second round, so each push touches a team once
+        team_games['round'] = team_games.groupby(['team_id', 'season', 'week']).cumcount()
+        values = game_values(team_games)
+
+    n_slots = int(team_games['team_id'].max()) + 1 if len(team_games) else 1
+    accumulators = {spec: make_window(spec, n_slots) for spec in windows}
+
+    frames = []
+    with metrics.stage("windows"):
+        week_keys = team_games[['season', 'week']].to_numpy()
+        team_ids, rounds_all = team_games['team_id'].to_numpy(), team_games['round'].to_numpy()
+        bounds = np.flatnonzero(np.any(np.diff(week_keys, axis=0) != 0, axis=1)) + 1
+        previous_season = None
+        for rows in np.split(np.arange(len(team_games)), bounds):
+            if rows.size == 0:
+                continue
+            season, week = (int(v) for v in week_keys[rows[0]])
+            if season != previous_season:
+                if previous_season is not None:
+                    metrics.season_progress(previous_season)
+                for window in accumulators.values():
+                    window.new_season()
+                previous_season = season
+
+            teams = np.unique(team_ids[rows])
+            for spec, window in accumulators.items():
+                frame, skipped = window_means(spec, teams, season, week, window.state(teams))
+                frames.append(frame)
+                metrics.season_counts(season, skipped_no_history=skipped)
+
+            rounds = rounds_all[rows]
+            for r in range(rounds.max() + 1):
+                batch = rows[rounds == r]
+                batch_teams = team_ids[batch]
+                for window in accumulators.values():
+                    window.push(batch_teams, values[batch])
+            metrics.season_counts(season, games_processed=rows.size // 2)
+        if previous_season is not None:
+            metrics.season_progress(previous_season)
+
+    with metrics.stage("rank"):
+        window_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+            columns=['window_name', 'team_id', 'season', 'week', *ROLLING_COLUMNS])
+        ranks = window_df.groupby(['window_name', 'season', 'week'])[ROLLING_COLUMNS].rank(ascending=False, method='min')
+        ranks.columns = RANK_COLUMNS
+        window_df = pd.concat([window_df, ranks], axis=1)
+
+    with metrics.stage("write"):
+        conn.executemany(
+            "DELETE FROM rolling_window_stats WHERE window_name = ?", [(spec,) for spec in windows])
+        columns = ['window_name', 'team_id', 'season', 'week', *ROLLING_COLUMNS, *RANK_COLUMNS]
+        conn.executemany(f"""
+            INSERT INTO rolling_window_stats ({", ".join(columns)})
+            VALUES ({", ".join("?" * len(columns))})
+        """, _to_sql_rows(window_df[columns]))
+        conn.commit()
+    conn.close()
+
+    for season, n in window_df['season'].value_counts().sort_index().items():
+        metrics.season_counts(season, rows_written=n)
+
+    print(f"\n[OK] Rolling stats computed for windows: {', '.join(windows)}.")
+    return metrics.report()
+
+# Run it (--windows season last5 ewm4 ...; --profile / --trace-memory / --report PATH: instrumentation)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Season-to-date, last-N and exponentially weighted rolling stats.")
+    parser.add_argument("--db", default="../db_management/cfb_stats.db")
+    parser.add_argument("--windows", nargs="+", default=WINDOWS)
+    args, _ = parser.parse_known_args()
+    compute_window_stats(args.db, args.windows, metrics=RunMetrics.from_argv("fillWindows"))
@@ -0,0 +1,93 @@
+import argparse
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_management"))
+from createDB import connect
+
+LEADER_COLUMNS = ['season', 'week', 'rank', 'team_id', 'team_name', 'rolling_elo', 'elo_delta']
+
+def season_list(conn, first_season=None, last_season=None):
+    # Seasons present in rolling_team_stats, optionally clipped to a range
+    rows = conn.execute("""
+        SELECT DISTINCT season FROM rolling_team_stats
+        WHERE season BETWEEN COALESCE(?, season) AND COALESCE(?, season)
+        ORDER BY season
+    """, (first_season, last_season)).fetchall()
+    return [row[0] for row in rows]
+
+def resolve_team(conn, team):
+    # team_id from a name or id; None stays None
+    if team is None or isinstance(team, int):
+        return team
+    row = conn.execute("SELECT team_id FROM teams WHERE team_name = ?", (team,)).fetchone()
+    if row is None:
+        raise ValueError(f"Unknown team {team!r}")
+    return row[0]
+
+def season_leaders(conn, season, n=10, team_id=None, include_unrated=False):
+    # Top n Elo per week of one season (n=None: every team), ranked and diffed inside SQLite so only the printed rows come back.
+    # Rank and week-over-week delta are computed over the whole season before the team filter is applied.
+    rated = "" if include_unrated else "AND rolling_elo IS NOT NULL"
+    return pd.read_sql_query(f"""
+        WITH ranked AS (
+            SELECT team_id, season, week, rolling_elo,
+                   ROW_NUMBER() OVER (PARTITION BY week ORDER BY rolling_elo DESC, team_id) AS rank,
+                   COALESCE(rolling_elo - LAG(rolling_elo) OVER (PARTITION BY team_id ORDER BY week), 0.0) AS elo_delta
+            FROM rolling_team_stats
+            WHERE season = ? {rated}
+        )
+        SELECT r.season, r.week, r.rank, r.team_id, t.team_name, r.rolling_elo, r.elo_delta
+        FROM ranked r
+        LEFT JOIN teams t ON t.team_id = r.team_id
+        WHERE r.rank <= COALESCE(?, r.rank) AND r.team_id = COALESCE(?, r.team_id)
+        ORDER BY r.week, r.rank
+    """, conn, params=(season, n, team_id))
+
+def weekly_leaders(conn, n=10, first_season=None, last_season=None, team=None, include_unrated=False):
+    # Stream (season, leaders) one season at a time
+    team_id = resolve_team(conn, team)
+    for season in season_list(conn, first_season, last_season):
+        yield season, season_leaders(conn, season, n, team_id, include_unrated)
+
+def week_leaders(conn, season, week, n=10):
+    # Top n Elo for a single week
+    return pd.read_sql_query("""
+        SELECT r.team_id, t.team_name, r.rolling_elo
+        FROM rolling_team_stats r
+        LEFT JOIN teams t ON t.team_id = r.team_id
+        WHERE r.season = ? AND r.week = ? AND r.rolling_elo IS NOT NULL
+        ORDER BY r.rolling_elo DESC, r.team_id
+        LIMIT ?
+    """, conn, params=(season, week, n))
+
+def team_history(conn, season, team_ids):
+    # Week-by-week Elo for a handful of teams in one season (for plotting)
+    team_ids = [int(t) for t in team_ids]
+    if not team_ids:
+        return pd.DataFrame(columns=['team_id', 'team_name', 'week', 'rolling_elo'])
+    return pd.read_sql_query(f"""
+        SELECT r.team_id, t.team_name, r.week, r.rolling_elo
+        FROM rolling_team_stats r
+        LEFT JOIN teams t ON t.team_id = r.team_id
+        WHERE r.season = ? AND r.rolling_elo IS NOT NULL
+          AND r.team_id IN ({", ".join("?" * len(team_ids))})
+        ORDER BY r.team_id, r.week
+    """, conn, params=(season, *team_ids))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Weekly Elo leaderboards straight from SQLite.")
+    parser.add_argument("--db", default="../db_management/cfb_stats.db")
+    parser.add_argument("-n", type=int, default=None, help="teams per week (default 10, or every week with --team)")
+    parser.add_argument("--seasons", type=int, nargs=2, metavar=("FIRST", "LAST"), default=(None, None))
+    parser.add_argument("--team", default=None, help="only show this team's weekly rank and delta")
+    args = parser.parse_args()
+
+    n = args.n or (None if args.team else 10)
+    conn = connect(args.db)
+    for season, leaders in weekly_leaders(conn, n, *args.seasons, team=args.team):
+        for week, top in leaders.groupby('week'):
+            print(f"\n Season {season} – Week {week}")
+            print(top[['rank', 'team_name', 'rolling_elo', 'elo_delta']].round(1).to_string(index=False))
+    conn.close()
@@ -1,54 +1,42 @@
-import sqlite3
+import os
+import sys
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_management"))
+from createDB import connect
+from validateDB import RANK_COLUMNS, run_check
+
 def check_rank_completeness(db_path):
-    conn = sqlite3.connect(db_path)
-
-    # Rank columns to check
-    rank_columns = [
-        "pass_yards_for_rank", "rush_yards_for_rank", "total_yards_for_rank", "points_scored_rank",
-        "pass_yards_against_rank", "rush_yards_against_rank", "total_yards_against_rank", "points_allowed_rank",
-        "elo_rank"
-    ]
-
-    # Load the full data
-    df = pd.read_sql_query(
-        f"SELECT team_id, season, week, " + ", ".join(rank_columns) + " FROM rolling_team_stats",
-        conn
-    )
-
-    if df.empty:
+    conn = connect(db_path)
+
+    # Count and preview in SQL rather than loading the table
+    if conn.execute("SELECT NOT EXISTS (SELECT 1 FROM rolling_team_stats)").fetchone()[0]:
         print("[ERROR] The rolling_team_stats table is empty. Cannot show an example week.")
         conn.close()
         return
 
     # Check for missing rank values
-    missing_ranks = df[df[rank_columns].isnull().any(axis=1)]
-
-    if missing_ranks.empty:
+    null_ranks = run_check(conn, "null_ranks")
+    if null_ranks['passed']:
         print("[OK] All ranks are properly filled out.")
     else:
         print("[WARNING] Missing rank values found. Here's a preview:")
-        print(missing_ranks.head())
-        print(f"\nTotal missing entries: {len(missing_ranks)}")
-        conn.close()
-        return
-
-    # Check if any grouped weeks exist
-    grouped = df.groupby(['season', 'week'])
-    if not grouped.groups:
-        print("[WARNING] No valid season/week combinations found with rank data.")
+        print(pd.DataFrame(null_ranks['sample']))
+        print(f"\nTotal missing entries: {null_ranks['violations']}")
         conn.close()
         return
 
-    # Show example week (first one in the list)
-    sample_key = next(iter(grouped.groups))
-    example_week_df = grouped.get_group(sample_key).sort_values(by='elo_rank')
+    # Show example week (the earliest one)
+    sample_key = conn.execute("SELECT season, week FROM rolling_team_stats ORDER BY season, week LIMIT 1").fetchone()
+    example_week_df = pd.read_sql_query(
+        "SELECT team_id, " + ", ".join(RANK_COLUMNS) + " FROM rolling_team_stats WHERE season = ? AND week = ? ORDER BY elo_rank",
+        conn, params=sample_key)
 
     print(f"\n Example season/week: {sample_key[0]} / Week {sample_key[1]}")
-    print(example_week_df[['team_id', *rank_columns]])
+    print(example_week_df[['team_id', *RANK_COLUMNS]])
 
     conn.close()
 
 # Run this
-check_rank_completeness("../db_management/cfb_stats.db")
+if __name__ == "__main__":
+    check_rank_completeness("../db_management/cfb_stats.db")
@@ -1,36 +1,36 @@
-import sqlite3
+import os
+import sys
 import pandas as pd
 
-def check_rank_completeness(db_path):
-    conn = sqlite3.connect(db_path)
-
-    rank_columns = [
-        "pass_yards_for_rank", "rush_yards_for_rank", "total_yards_for_rank", "points_scored_rank",
-        "pass_yards_against_rank", "rush_yards_against_rank", "total_yards_against_rank", "points_allowed_rank",
-        "elo_rank"
-    ]
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_management"))
+from createDB import connect
+from validateDB import run_check
 
-    # Load everything
-    df = pd.read_sql_query("SELECT * FROM rolling_team_stats", conn)
+def check_rank_completeness(db_path):
+    conn = connect(db_path)
 
-    if df.empty:
+    if conn.execute("SELECT NOT EXISTS (SELECT 1 FROM rolling_team_stats)").fetchone()[0]:
         print("[ERROR] No entries found in rolling_team_stats.")
         conn.close()
         return
 
-    # Find rows with missing rank values
-    missing_ranks = df[df[rank_columns].isnull().any(axis=1)]
+    # Find rows with missing rank values (counted in SQL, only a preview comes back)
+    null_ranks = run_check(conn, "null_ranks")
 
-    if missing_ranks.empty:
+    if null_ranks['passed']:
         print("[OK] All ranks are properly filled out.")
-        print(df.head())
+        print(pd.read_sql_query("SELECT * FROM rolling_team_stats LIMIT 5", conn))
     else:
         print("[WARNING] Missing rank values found. First 5 incomplete rows below (all columns):")
         pd.set_option('display.max_columns', None)
-        print(missing_ranks.head())
-        print(f"\nTotal missing entries: {len(missing_ranks)}")
+        keys = [(row['team_id'], row['season'], row['week']) for row in null_ranks['sample']]
+        print(pd.concat([pd.read_sql_query(
+            "SELECT * FROM rolling_team_stats WHERE team_id = ? AND season = ? AND week = ?", conn, params=key)
+            for key in keys], ignore_index=True))
+        print(f"\nTotal missing entries: {null_ranks['violations']}")
 
     conn.close()
 
 # Run it
-check_rank_completeness("../db_management/cfb_stats.db")
+if __name__ == "__main__":
+    check_rank_completeness("../db_management/cfb_stats.db")
@@ -0,0 +1,222 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, "db_management"))
+sys.path.append(os.path.join(HERE, "mrankings"))
+
+from createDB import connect, create_database, SCHEMA_VERSION
+from runMetrics import RunMetrics, add_arguments
+from seasonStore import fingerprint, load_store
+
+DB_PATH = os.path.join(HERE, "db_management", "cfb_stats.db")
+DATA_PATH = os.path.join(HERE, "..", "data", "cfb_box-scores_2002-2024.xlsx")
+CACHE_DIR = os.path.join(HERE, "..", "data", ".cache")
+
+# Columns each stage writes to rolling_team_stats (fillElo and fillMasseyColley overwrite their own columns of
+# fillRanks' rows, so each stage's output is hashed over just its columns)
+RANK_COLUMNS = [
+    "rolling_pass_yards_for", "rolling_rush_yards_for", "rolling_total_yards_for", "rolling_points_scored",
+    "rolling_pass_yards_against", "rolling_rush_yards_against", "rolling_total_yards_against", "rolling_points_allowed",
+    "pass_yards_for_rank", "rush_yards_for_rank", "total_yards_for_rank", "points_scored_rank",
+    "pass_yards_against_rank", "rush_yards_against_rank", "total_yards_against_rank", "points_allowed_rank",
+]
+
+def _rolling_rows(columns):
+    return f"SELECT team_id, season, week, {', '.join(columns)} FROM rolling_team_stats ORDER BY team_id, season, week"
+
+# stage -> (upstream stages, output query). A stage reruns when the hash of its parameters, its own inputs and
+# its upstream stages' hashes changes, or when the content hash of its output rows no longer matches what it wrote.
+STAGES = {
+    'createDB': ([], "SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name"),
+    'fillDB': (['createDB'], None),
+    'fillRanks': (['fillDB'], _rolling_rows(RANK_COLUMNS)),
+    'fillWindows': (['fillDB'], "SELECT * FROM rolling_window_stats ORDER BY window_name, team_id, season, week"),
+    'fillElo': (['fillRanks'], _rolling_rows(["rolling_elo", "elo_rank"])),
+    'fillMasseyColley': (['fillRanks'], _rolling_rows(["rolling_massey", "massey_rank", "rolling_colley", "colley_rank"])),
+    'validateDB': (['fillElo', 'fillMasseyColley', 'fillWindows'], None),
+}
+
+def _hash(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+def table_fingerprint(db_path):
+    conn = connect(db_path)
+    try:
+        return fingerprint(conn)
+    finally:
+        conn.close()
+
+def stage_inputs(stage, db_path, params):
+    # Whatever this stage reads besides its upstream stages
+    if stage == 'createDB':
+        return [SCHEMA_VERSION]
+    if stage == 'fillDB':
+        from sheetCache import file_hash
+        return [file_hash(params['data_path']), params['sheet_name']]
+    if stage == 'fillElo':
+        return [table_fingerprint(db_path), params['base_k'], params['decay_factor'], params['rank_divisor']]
+    if stage == 'fillWindows':
+        return [table_fingerprint(db_path), params['windows']]
+    return [table_fingerprint(db_path)]
+
+def output_signature(stage, db_path):
+    # sha256 over every output row (fillDB: the source tables' change stamps)
+    query = STAGES[stage][1]
+    if query is None:
+        return table_fingerprint(db_path) if stage == 'fillDB' else ""
+    conn = connect(db_path)
+    try:
+        digest = hashlib.sha256()
+        for row in conn.execute(query):
+            digest.update(repr(row).encode())
+        return digest.hexdigest()
+    finally:
+        conn.close()
+
+def load_state(db_path):
+    if not os.path.exists(db_path):
+        return {}
+    conn = connect(db_path)
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'pipeline_stages'").fetchone():
+            return {}
+        return {row[0]: row[1:] for row in conn.execute("SELECT stage, input_hash, output_signature FROM pipeline_stages")}
+    finally:
+        conn.close()
+
+def save_state(db_path, stage, input_hash, seconds):
+    signature = output_signature(stage, db_path)
+    conn = connect(db_path)
+    conn.execute("INSERT OR REPLACE INTO pipeline_stages VALUES (?, ?, ?, ?, datetime('now'))",
+                 (stage, input_hash, signature, round(seconds, 4)))
+    conn.commit()
+    conn.close()
+
+def run_stage(stage, db_path, params):
+    # Runs in a worker process; returns (stage, seconds, captured output)
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        if stage == 'createDB':
+            if not os.path.exists(db_path) or params['fresh']:
+                create_database(db_path)
+            else:
+                connect(db_path).close()  # migrates an existing database in place
+        elif stage == 'fillDB':
+            import pandas as pd
+            from fillDB import bulk_insert_data
+            from sheetCache import load_sheet
+            data_path = params['data_path']
+            df = (pd.read_csv(data_path) if data_path.endswith(".csv")
+                  else load_sheet(data_path, params['sheet_name'], CACHE_DIR))
+            bulk_insert_data(df, db_path)
+        elif stage == 'fillRanks':
+            from fillRanks import compute_rolling_team_stats
+            compute_rolling_team_stats(db_path, verbose=False, incremental=True)
+        elif stage == 'fillWindows':
+            from fillWindows import compute_window_stats
+            compute_window_stats(db_path, params['windows'], verbose=False)
+        elif stage == 'fillElo':
+            from fillElo import update_elo_ratings
+            update_elo_ratings(db_path, base_k=params['base_k'], decay_factor=params['decay_factor'],
+                               rank_divisor=params['rank_divisor'], verbose=False, incremental=True)
+        elif stage == 'fillMasseyColley':
+            from fillMasseyColley import compute_massey_colley
+            compute_massey_colley(db_path, verbose=False)
+        elif stage == 'validateDB':
+            from validateDB import validate_database
+            report = validate_database(db_path)
+            if not report['passed']:
+                raise RuntimeError(f"Validation failed:\n{out.getvalue()}")
+    return stage, time.perf_counter() - start, out.getvalue()
+
+def run_pipeline(db_path=DB_PATH, params=None, force=(), only=None, workers=None, dry_run=False, metrics=None):
+    metrics = metrics or RunMetrics("runPipeline")
+    params = {'data_path': DATA_PATH, 'sheet_name': "cleaned", 'base_k': 25, 'decay_factor': 0.97,
+              'rank_divisor': 25, 'windows': ["season", "last5", "ewm4"], 'fresh': False, **(params or {})}
+    selected = [s for s in STAGES if only is None or s in only]
+    previous = load_state(db_path)
+    hashes, status, running = {}, {}, {}
+
+    def ready(stage):
+        return all(dep in status or dep not in selected for dep in STAGES[stage][0])
+
+    def needs_run(stage):
+        # Hashed only once upstream stages have finished, so table fingerprints reflect what they wrote
+        deps = STAGES[stage][0]
+        if any(status.get(dep) == 'planned' for dep in deps):
+            return True
+        upstream = [hashes.get(dep, (previous.get(dep) or (None,))[0]) for dep in deps]
+        hashes[stage] = _hash(stage, stage_inputs(stage, db_path, params), upstream)
+        old = previous.get(stage)
+        if stage in force or old is None or old[0] != hashes[stage]:
+            return True
+        return old[1] != output_signature(stage, db_path)
+
+    pending = list(selected)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for stage in [s for s in pending if ready(s)]:
+                pending.remove(stage)
+                if not needs_run(stage):
+                    status[stage] = 'skipped'
+                    print(f"  [SKIP] {stage}: inputs unchanged")
+                elif dry_run:
+                    status[stage] = 'planned'
+                    print(f"  [RUN]  {stage} (dry run)")
+                else:
+                    if stage != 'createDB' and os.path.exists(db_path):
+                        load_store(db_path)  # build the shared season store once, before stages fan out
+                    print(f"  [LOADING] {stage}")
+                    running[pool.submit(run_stage, stage, db_path, params)] = stage
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                _, seconds, _ = future.result()
+                if stage == 'createDB':
+                    hashes[stage] = _hash(stage, stage_inputs(stage, db_path, params), [])
+                save_state(db_path, stage, hashes[stage], seconds)
+                metrics.add_stage(stage, seconds)
+                status[stage] = 'ran'
+                print(f"  [OK] {stage} finished in {seconds:.2f}s")
+
+    counts = {st: sum(v == st for v in status.values()) for st in ('ran', 'planned', 'skipped')}
+    for st, n in counts.items():
+        metrics.count(f"stages_{st}", n)
+    print(f"\n[OK] Pipeline done: {counts['ran']} stage(s) ran, {counts['planned']} would run, {counts['skipped']} skipped.")
+    return status
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run createDB → fillDB → fillRanks/fillWindows → fillElo/fillMasseyColley → validateDB, skipping stages whose inputs are unchanged.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--data", default=DATA_PATH, help="box-score workbook (.xlsx) or .csv")
+    parser.add_argument("--base-k", type=float, default=25)
+    parser.add_argument("--decay-factor", type=float, default=0.97)
+    parser.add_argument("--rank-divisor", type=float, default=25)
+    parser.add_argument("--windows", nargs="+", default=["season", "last5", "ewm4"])
+    parser.add_argument("--force", nargs="+", default=[], choices=list(STAGES), help="rerun these stages regardless")
+    parser.add_argument("--only", nargs="+", default=None, choices=list(STAGES), help="run just these stages")
+    parser.add_argument("--fresh", action="store_true", help="recreate the database from scratch")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="show what would run")
+    add_arguments(parser)
+    args = parser.parse_args()
+    metrics = RunMetrics.from_argv("runPipeline")
+
+    params = {'data_path': os.path.abspath(args.data), 'base_k': args.base_k, 'decay_factor': args.decay_factor,
+              'rank_divisor': args.rank_divisor, 'windows': args.windows, 'fresh': args.fresh}
+    force = set(args.force) | ({'createDB'} if args.fresh else set())
+    print(f"[LOADING] Pipeline for {os.path.abspath(args.db)}")
+    run_pipeline(os.path.abspath(args.db), params, force, args.only, args.workers, args.dry_run, metrics)
+    metrics.report()